@@ -0,0 +1,63 @@
+import os
+import time
+import argparse as ap
+
+from vrp_utils import BINARY_EXTENSION, load_distance_matrix, save_distance_matrix_binary
+
+parser = ap.ArgumentParser(
+    prog="VRP Convert Graphs",
+    description="Convert text edge-list graphs to the binary instance format",
+)
+
+
+def add_arguments():
+    parser.add_argument(
+        "-i",
+        "--input",
+        type=str,
+        required=True,
+        help="Path to a text graph file or a folder of them",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help=f"Output folder (default: the input folder with a '_{BINARY_EXTENSION[1:]}' suffix)",
+    )
+
+    return parser.parse_args()
+
+
+def convert_graph(input_filename: str, output_dir: str) -> str:
+    """
+    Convert a text graph file to the binary instance format.
+
+    Parameters:
+    input_filename (str): The text graph file
+    output_dir (str): The folder to write the binary file to
+
+    Returns:
+    output_filename (str): The written binary file
+    """
+    name = os.path.splitext(os.path.basename(input_filename))[0]
+    output_filename = os.path.join(output_dir, name + BINARY_EXTENSION)
+    save_distance_matrix_binary(load_distance_matrix(input_filename), output_filename)
+    return output_filename
+
+
+if __name__ == "__main__":
+    args = add_arguments()
+    if os.path.isdir(args.input):
+        input_dir = args.input
+        filenames = [os.path.join(input_dir, f) for f in sorted(os.listdir(input_dir)) if f.endswith(".txt")]
+    else:
+        input_dir = os.path.dirname(args.input)
+        filenames = [args.input]
+    output_dir = args.output or os.path.normpath(input_dir) + f"_{BINARY_EXTENSION[1:]}"
+    os.makedirs(output_dir, exist_ok=True)
+
+    for filename in filenames:
+        start_time = time.time()
+        output_filename = convert_graph(filename, output_dir)
+        print(f"{filename} -> {output_filename} ({time.time() - start_time:.2f} seconds)")
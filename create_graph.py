@@ -1,128 +1,163 @@
-import networkx as nx
-import random
+import numpy as np
 import os
 
+from vrp_utils import DEPOT, BINARY_EXTENSION, COORDINATES_EXTENSION, write_binary_header, save_coordinates
+
 NODES_LIST = [5,6,7,8,9,10,11,12,13,14,15,17,20, 25, 35, 50, 57, 100, 200, 500, 1000]
 GRAPH_DESITY = 1
 MIN_WEIGHT = 50
 MAX_WEIGHT = 200
+NODE_LABELS = "padded"  # "padded" (depot A, customers 001, 002, ...) or "letters" (A, B, C, ... as in the first data sets)
+OUTPUT_FORMAT = "txt"  # "txt" (edge list), "vrpb" (binary, see vrp_utils.save_distance_matrix_binary) or "xy" (coordinates, see vrp_utils.load_coordinates)
+COORDINATE_RANGE = 1000  # Nodes of "xy" instances get integer coordinates in [0, COORDINATE_RANGE); these graphs are always complete
+SEED = None  # Seed of the random generator (None = different graphs every run)
 
-GRAPHS_DIRECTORY = f"graphs/{NODES_LIST[0]}-{NODES_LIST[-1]}_{str(GRAPH_DESITY).replace('.', '')}"
-
-
-
-
+# Number of edges formatted or written at a time
+CHUNK_EDGES = 1 << 20
 
+GRAPHS_DIRECTORY = f"graphs/{NODES_LIST[0]}-{NODES_LIST[-1]}_{str(GRAPH_DESITY).replace('.', '')}"
 
 
-def create_graph(edges:list)->nx.Graph:
+def generate_nodes(n: int) -> list:
     """
-    Create an undirected graph with custom edge weights.
+    Generate a list of node labels, the depot first.
 
     Parameters:
-    edges (list of tuples): Each tuple contains (node1, node2, weight)
+    n (int): Number of nodes
 
     Returns:
-    G (networkx.Graph): The generated graph
+    nodes (list): List of nodes
     """
-    G = nx.Graph()
-    G.add_weighted_edges_from(edges)
-    return G
+    if NODE_LABELS == "letters":
+        return [chr(i) for i in range(65, 65 + n)]
+    width = len(str(n - 1))
+    return [DEPOT] + [f"{i:0{width}d}" for i in range(1, n)]
 
-def generate_edges_with_weights(nodes:list)->list:
+
+def generate_weights(n: int, rng: np.random.Generator) -> np.ndarray:
     """
-    Generate a list of edges with random weights for a given list of nodes.
+    Generate random weights for all edges of a complete graph at once.
+
+    The edges (i, j), i < j, are ordered row by row, as in the condensed upper triangle of
+    the weight matrix.
 
     Parameters:
-    nodes (list): List of nodes
-    max_weight (int): Maximum weight for the edges
+    n (int): Number of nodes
+    rng (numpy.random.Generator): The random generator
 
     Returns:
-    edges (list of tuples): Each tuple contains (node1, node2, weight)
+    weights (numpy.ndarray): The weight of every edge
     """
-    edges = []
-    for i in range(len(nodes)):
-        for j in range(i + 1, len(nodes)):
-            weight = random.randint(MIN_WEIGHT, MAX_WEIGHT)
-            edges.append((nodes[i], nodes[j], weight))
-    return edges
-
-def generate_nodes(n:int)->list:
+    return rng.integers(MIN_WEIGHT, MAX_WEIGHT, size=n * (n - 1) // 2, endpoint=True, dtype=np.int32)
+
+
+def generate_coordinates(n: int, rng: np.random.Generator) -> np.ndarray:
     """
-    Generate a list of nodes.
+    Generate random integer coordinates of all nodes, uniform over a square.
 
     Parameters:
     n (int): Number of nodes
+    rng (numpy.random.Generator): The random generator
 
     Returns:
-    nodes (list): List of nodes
+    coordinates (numpy.ndarray): The coordinates of every node (n x 2)
     """
-    nodes = [chr(i) for i in range(65, 65 + n)]
-    return nodes
+    return rng.integers(0, COORDINATE_RANGE, size=(n, 2))
+
 
-def delete_random_edges(edges:list, x:int):
+def delete_random_edges(edges_count: int, x: int, rng: np.random.Generator) -> np.ndarray:
     """
-    Delete x random edges from the list of edges.
+    Choose x random edges to delete.
 
     Parameters:
-    edges (list of tuples): List of edges
+    edges_count (int): Number of edges
     x (int): Number of edges to delete
+    rng (numpy.random.Generator): The random generator
 
     Returns:
-    edges (list of tuples): List of edges after deletion
+    keep (numpy.ndarray): Mask of the edges that are kept
     """
-    if x > len(edges):
+    if x > edges_count:
         raise ValueError("Number of edges to delete exceeds the total number of edges")
-    edges_to_delete = random.sample(edges, x)
-    for edge in edges_to_delete:
-        edges.remove(edge)
-    return edges
+    keep = np.ones(edges_count, dtype=bool)
+    keep[rng.choice(edges_count, x, replace=False)] = False
+    return keep
+
 
-def print_graph(graph:nx.Graph)->None:
+def write_graph_text(filename: str, nodes: list, weights: np.ndarray, keep: np.ndarray):
     """
-    Print the graph.
+    Write the kept edges as a text edge list, flushing every CHUNK_EDGES lines.
 
     Parameters:
-    graph (networkx.Graph): The graph to print
+    filename (str): The name of the file
+    nodes (list): The node labels
+    weights (numpy.ndarray): The weight of every edge, see generate_weights()
+    keep (numpy.ndarray): Mask of the edges that are kept
     """
-    for u, v, weight in graph.edges(data='weight'):
-        print(f"({u}, {v}, {weight})")
-        
-def print_graph_to_file(graph:nx.Graph, filename:str)->None:
+    n = len(nodes)
+    with open(filename, "w") as file:
+        lines = []
+        start = 0
+        for row in range(n - 1):
+            end = start + n - 1 - row
+            kept = keep[start:end]
+            columns = (np.flatnonzero(kept) + row + 1).tolist()
+            prefix = f"({nodes[row]}, "
+            lines += [f"{prefix}{nodes[j]}, {w})\n" for j, w in zip(columns, weights[start:end][kept].tolist())]
+            if len(lines) >= CHUNK_EDGES:
+                file.write("".join(lines))
+                lines = []
+            start = end
+        file.write("".join(lines))
+
+
+def write_graph_binary(filename: str, nodes: list, weights: np.ndarray, keep: np.ndarray):
     """
-    Print the graph to a file.
+    Write the graph in the binary instance format, a chunk of edges at a time.
 
     Parameters:
-    graph (networkx.Graph): The graph to print
     filename (str): The name of the file
+    nodes (list): The node labels
+    weights (numpy.ndarray): The weight of every edge, see generate_weights()
+    keep (numpy.ndarray): Mask of the edges that are kept
     """
-    with open (filename, "w") as file:
-        for u, v, weight in graph.edges(data='weight'):
-            file.write(f"({u}, {v}, {weight})\n")
+    with open(filename, "wb") as file:
+        write_binary_header(file, nodes, np.float32)
+        for start in range(0, len(weights), CHUNK_EDGES):
+            chunk = weights[start : start + CHUNK_EDGES].astype(np.float32)
+            chunk[~keep[start : start + CHUNK_EDGES]] = np.inf
+            file.write(chunk.tobytes())
+
 
 def main():
     # Create directory if it doesn't exist
     if not os.path.exists(GRAPHS_DIRECTORY):
         os.makedirs(GRAPHS_DIRECTORY)
 
+    rng = np.random.default_rng(SEED)
     for NODES in NODES_LIST:
         EDGES = NODES * (NODES - 1) // 2
         EDGES_TO_DELETE = round(EDGES * (1 - GRAPH_DESITY))
         # Generate nodes
         nodes = generate_nodes(NODES)
-        
+
+        # Coordinate instances store no edges at all
+        if OUTPUT_FORMAT == "xy":
+            save_coordinates(f"{GRAPHS_DIRECTORY}/graph_{NODES:03d}{COORDINATES_EXTENSION}", nodes, generate_coordinates(NODES, rng))
+            continue
+
         # Generate edges with random weights
-        edges = generate_edges_with_weights(nodes)
-        
+        weights = generate_weights(NODES, rng)
+
         # Delete random edges
-        edges = delete_random_edges(edges, EDGES_TO_DELETE)
-        
-        # Create a graph
-        graph = create_graph(edges)
+        keep = delete_random_edges(EDGES, EDGES_TO_DELETE, rng)
+
+        # Write the edges with weights
+        if OUTPUT_FORMAT == "vrpb":
+            write_graph_binary(f"{GRAPHS_DIRECTORY}/graph_{NODES:03d}{BINARY_EXTENSION}", nodes, weights, keep)
+        else:
+            write_graph_text(f"{GRAPHS_DIRECTORY}/graph_{NODES:03d}.txt", nodes, weights, keep)
 
-        # Print the edges with weights
-        # print_graph(graph)
-        print_graph_to_file(graph, f"{GRAPHS_DIRECTORY}/graph_{NODES:03d}.txt")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,381 @@
+import networkx as nx
+import numpy as np
+import functools
+import math
+import sys
+import os
+import time
+import random
+from vrp_utils import (
+    DistanceMatrix,
+    load_distance_matrix,
+    as_distance_matrix,
+    calculate_route_cost_matrix,
+    save_results_to_json,
+    StopCondition,
+    get_routes,
+)
+from vrp_instance_cache import InstanceCache
+from vrp_construction import savings_routes
+
+INPUT_GRAPHS = "5-1000_1"
+INPUT_DIR = f"graphs/{INPUT_GRAPHS}"
+
+OUTPUT_FILENAME = f"results/algs_to_compare/{INPUT_GRAPHS}_VRP_a-ALNS.json"
+
+VEHICLES_AMOUNTS = [1, 2, 3, 4]
+SHORTEST_PATHS = False  # Route through intermediate nodes of sparse graphs (see vrp_utils.shortest_path_closure)
+
+ITERATIONS = 3000
+REMOVAL_FRACTION = (0.05, 0.25)  # Range of the share of customers removed per iteration
+MAX_REMOVED = 50  # Upper bound on the number of customers removed per iteration
+WORST_RANDOMNESS = 3  # Higher values make the worst removal more deterministic
+SHAW_RANDOMNESS = 6  # Higher values make the related removal more deterministic
+
+SEGMENT_LENGTH = 100  # Iterations between updates of the operator weights
+REACTION_FACTOR = 0.1  # Share of the segment scores in the updated weights
+# Operator scores for a new best solution, an improvement of the current one, an accepted worse one
+SCORES = (33, 9, 13)
+MIN_WEIGHT = 0.01  # Lower bound on the operator weights
+
+INITIAL_WORSENING = 0.05  # Relative worsening accepted with probability 1/2 at the start
+FINAL_TEMPERATURE_RATIO = 1e-3  # Final temperature relative to the initial one
+
+
+def _finite(values: np.ndarray) -> np.ndarray:
+    """
+    Replace the undefined (nan) costs of moves through missing edges with infinity.
+    """
+    return np.where(np.isnan(values), np.inf, values)
+
+
+def _pick(order: list, randomness: float) -> int:
+    """
+    Pop a random element of a sorted list, biased towards its front.
+    """
+    return order.pop(int(random.random() ** randomness * len(order)))
+
+
+def random_removal(weights: np.ndarray, routes: list, count: int) -> list:
+    """
+    Choose random customers to remove.
+
+    Parameters:
+    weights (numpy.ndarray): The distance matrix weights
+    routes (list of lists): The routes of customer ids (without the depot)
+    count (int): The number of customers to remove
+
+    Returns:
+    removed (list): The customers to remove
+    """
+    return random.sample([node for route in routes for node in route], count)
+
+
+def worst_removal(weights: np.ndarray, routes: list, count: int) -> list:
+    """
+    Choose the customers whose removal saves the most, with some randomization.
+
+    The savings w(p, x) + w(x, s) - w(p, s) of all customers are computed in one vectorized
+    pass and the customers are drawn from the sorted list with a bias towards its front.
+
+    Parameters:
+    weights (numpy.ndarray): The distance matrix weights
+    routes (list of lists): The routes of customer ids (without the depot)
+    count (int): The number of customers to remove
+
+    Returns:
+    removed (list): The customers to remove
+    """
+    nodes, prev, succ = [], [], []
+    for route in routes:
+        path = [0] + route + [0]
+        nodes += route
+        prev += path[:-2]
+        succ += path[2:]
+    with np.errstate(invalid="ignore"):
+        savings = weights[prev, nodes] + weights[nodes, succ] - weights[prev, succ]
+    order = np.array(nodes)[np.argsort(-_finite(savings), kind="stable")].tolist()
+    return [_pick(order, WORST_RANDOMNESS) for _ in range(count)]
+
+
+def shaw_removal(weights: np.ndarray, routes: list, count: int) -> list:
+    """
+    Choose related (close) customers, so that the repair can rearrange them together.
+
+    Starting from a random customer, every next customer is drawn among the ones closest to
+    a random already chosen customer, with a bias towards the closest.
+
+    Parameters:
+    weights (numpy.ndarray): The distance matrix weights
+    routes (list of lists): The routes of customer ids (without the depot)
+    count (int): The number of customers to remove
+
+    Returns:
+    removed (list): The customers to remove
+    """
+    remaining = np.array([node for route in routes for node in route])
+    removed = [int(random.choice(remaining))]
+    remaining = remaining[remaining != removed[0]]
+    while len(removed) < count:
+        reference = random.choice(removed)
+        order = remaining[np.argsort(weights[reference, remaining], kind="stable")].tolist()
+        node = _pick(order, SHAW_RANDOMNESS)
+        removed.append(node)
+        remaining = remaining[remaining != node]
+    return removed
+
+
+def insertion_costs(weights: np.ndarray, route: list, nodes: np.ndarray) -> tuple:
+    """
+    Find the cheapest position of every node in a route.
+
+    Parameters:
+    weights (numpy.ndarray): The distance matrix weights
+    route (list): The route of customer ids (without the depot)
+    nodes (numpy.ndarray): The nodes to insert
+
+    Returns:
+    costs (numpy.ndarray): The cost increase of the cheapest insertion of every node
+    positions (numpy.ndarray): The index in the route at which every node is inserted
+    """
+    path = np.array([0] + route + [0])
+    u, v = path[:-1], path[1:]
+    with np.errstate(invalid="ignore"):
+        costs = _finite(weights[u[None, :], nodes[:, None]] + weights[nodes[:, None], v[None, :]] - weights[u, v][None, :])
+    positions = np.argmin(costs, axis=1)
+    return costs[np.arange(len(nodes)), positions], positions
+
+
+def regret_insertion(weights: np.ndarray, routes: list, removed: list, regret: int = 1):
+    """
+    Insert the removed customers back into the routes in place.
+
+    The cheapest insertion of every pending customer into every route is cached in a
+    (customers x routes) table. An insertion replaces one edge of a route with two, so the
+    cached costs are only compared with these two new edges, and recomputed over the whole
+    route just for the customers whose best edge was the replaced one. The customer inserted
+    next is the one with the largest regret, the cost difference between its best route and
+    its regret - 1 next best ones, so customers with few good options are placed first. With
+    regret = 1 this is the greedy insertion of the overall cheapest customer.
+
+    Parameters:
+    weights (numpy.ndarray): The distance matrix weights
+    routes (list of lists): The routes of customer ids (without the depot), modified in place
+    removed (list): The customers to insert
+    regret (int): The number of routes compared by the regret
+    """
+    pending = np.array(removed)
+    costs = np.empty((len(pending), len(routes)))
+    positions = np.empty((len(pending), len(routes)), dtype=np.int64)
+    for r, route in enumerate(routes):
+        costs[:, r], positions[:, r] = insertion_costs(weights, route, pending)
+
+    regret = min(regret, len(routes))
+    # Moves through missing edges have undefined (nan) costs, replaced by _finite()
+    with np.errstate(invalid="ignore"):
+        while len(pending):
+            best = costs.min(axis=1)
+            if regret > 1:
+                regrets = _finite(np.sort(costs, axis=1)[:, 1:regret].sum(axis=1) - (regret - 1) * best)
+                # The largest regret first, ties broken by the cheapest insertion
+                i = int(np.lexsort((best, -regrets))[0])
+            else:
+                i = int(np.argmin(best))
+            r = int(np.argmin(costs[i]))
+            route = routes[r]
+            p, node = int(positions[i, r]), int(pending[i])
+            u = route[p - 1] if p > 0 else 0
+            v = route[p] if p < len(route) else 0
+            route.insert(p, node)
+
+            keep = np.arange(len(pending)) != i
+            pending, costs, positions = pending[keep], costs[keep], positions[keep]
+            if not len(pending):
+                break
+            # Customers that lost their best edge (u, v) look at the whole route again
+            lost = positions[:, r] == p
+            positions[positions[:, r] > p, r] += 1
+            if lost.any():
+                costs[lost, r], positions[lost, r] = insertion_costs(weights, route, pending[lost])
+            # The others only compare their best edge with the new edges (u, node) and (node, v)
+            for edge, (a, b) in enumerate(((u, node), (node, v))):
+                new_costs = _finite(weights[a, pending] + weights[pending, b] - weights[a, b])
+                better = ~lost & (new_costs < costs[:, r])
+                costs[better, r] = new_costs[better]
+                positions[better, r] = p + edge
+
+
+DESTROY_OPERATORS = {
+    "random": random_removal,
+    "worst": worst_removal,
+    "shaw": shaw_removal,
+}
+
+REPAIR_OPERATORS = {
+    "greedy": regret_insertion,
+    "regret_2": functools.partial(regret_insertion, regret=2),
+    "regret_3": functools.partial(regret_insertion, regret=3),
+}
+
+
+def total_cost(distances: DistanceMatrix, routes: list) -> float:
+    """
+    Sum the costs of the routes (inf if an edge is missing).
+    """
+    return float(sum(calculate_route_cost_matrix(distances, np.array(route, dtype=np.int64)[None, :])[0] for route in routes))
+
+
+def update_weights(weights: list, scores: list, uses: list):
+    """
+    Blend the average score of every operator over the last segment into its weight in place,
+    and reset the scores and uses for the next segment.
+    """
+    for k in range(len(weights)):
+        if uses[k]:
+            weights[k] = (1 - REACTION_FACTOR) * weights[k] + REACTION_FACTOR * scores[k] / uses[k]
+        # Keep every operator selectable
+        weights[k] = max(weights[k], MIN_WEIGHT)
+        scores[k], uses[k] = 0.0, 0
+
+
+def vrp_alns(
+    graph: nx.Graph,
+    vehicles_amount: int,
+    iterations: int = ITERATIONS,
+    stop: StopCondition = None,
+) -> tuple:
+    """
+    Solve the Vehicle Routing Problem using Adaptive Large Neighborhood Search.
+
+    Starting from the Clarke-Wright savings routes, every iteration removes a random share of
+    the customers with a destroy operator and inserts them back with a repair operator. The
+    operators are drawn by roulette wheel; their weights are updated every SEGMENT_LENGTH
+    iterations from the SCORES of the solutions they produced. A new solution replaces the
+    current one under the simulated-annealing criterion, the temperature decreasing
+    geometrically over the iterations.
+
+    Parameters:
+    graph (networkx.Graph | DistanceMatrix): The graph
+    vehicles_amount (int): The number of vehicles
+    iterations (int): The number of iterations
+    stop (StopCondition): Stop before the last iteration once these criteria are met, patience
+        being counted in iterations, or when interrupted
+
+    Returns:
+    best_routes (list of lists): The best routes for each vehicle
+    best_cost (int): The total cost of the best routes
+    """
+    distances = as_distance_matrix(graph)
+    weights = distances.weights
+    customers = len(distances.customers())
+    routes = savings_routes(distances, vehicles_amount)
+    routes += [[] for _ in range(vehicles_amount - len(routes))]
+    cost = best_cost = total_cost(distances, routes)
+    best_routes = [route.copy() for route in routes]
+
+    destroy_names, repair_names = list(DESTROY_OPERATORS), list(REPAIR_OPERATORS)
+    destroy_weights, repair_weights = [1.0] * len(destroy_names), [1.0] * len(repair_names)
+    destroy_scores, repair_scores = [0.0] * len(destroy_names), [0.0] * len(repair_names)
+    destroy_uses, repair_uses = [0] * len(destroy_names), [0] * len(repair_names)
+
+    low = max(1, int(REMOVAL_FRACTION[0] * customers))
+    high = max(low, min(int(REMOVAL_FRACTION[1] * customers), MAX_REMOVED))
+    temperature = -INITIAL_WORSENING * cost / math.log(0.5) if math.isfinite(cost) and cost > 0 else 1.0
+    cooling = FINAL_TEMPERATURE_RATIO ** (1 / max(iterations, 1))
+
+    try:
+        for iteration in range(iterations if customers > 1 else 0):
+            d = random.choices(range(len(destroy_names)), destroy_weights)[0]
+            r = random.choices(range(len(repair_names)), repair_weights)[0]
+            candidate = [route.copy() for route in routes]
+            removed = DESTROY_OPERATORS[destroy_names[d]](weights, candidate, random.randint(low, min(high, customers)))
+            removed_set = set(removed)
+            candidate = [[node for node in route if node not in removed_set] for route in candidate]
+            REPAIR_OPERATORS[repair_names[r]](weights, candidate, removed)
+            candidate_cost = total_cost(distances, candidate)
+
+            score = 0
+            delta = candidate_cost - cost
+            if delta < 0 or random.random() < math.exp(-delta / temperature):
+                if candidate_cost < best_cost:
+                    best_cost = candidate_cost
+                    best_routes = [route.copy() for route in candidate]
+                    score = SCORES[0]
+                elif delta < 0:
+                    score = SCORES[1]
+                else:
+                    score = SCORES[2]
+                routes, cost = candidate, candidate_cost
+            destroy_scores[d] += score
+            repair_scores[r] += score
+            destroy_uses[d] += 1
+            repair_uses[r] += 1
+
+            if (iteration + 1) % SEGMENT_LENGTH == 0:
+                update_weights(destroy_weights, destroy_scores, destroy_uses)
+                update_weights(repair_weights, repair_scores, repair_uses)
+            temperature *= cooling
+            if stop is not None:
+                stop.record(cost)
+                if stop.should_stop():
+                    break
+    except KeyboardInterrupt:
+        # Return the best solution found so far
+        if stop is None:
+            raise
+        stop.interrupted = True
+
+    if not math.isfinite(best_cost):
+        return None, sys.maxsize
+    return [distances.to_labels(route) for route in best_routes], int(best_cost)
+
+
+if __name__ == "__main__":
+    results = []
+
+    # Initialize the JSON file
+    save_results_to_json(results, OUTPUT_FILENAME)
+    instances = InstanceCache() if SHORTEST_PATHS else None
+
+    for f in sorted(os.listdir(INPUT_DIR)):
+        graph_filename = os.path.join(INPUT_DIR, f)
+        print(f"Processing {graph_filename}")
+        # Load the graph (or its shortest path closure, cached between runs)
+        graph = instances.shortest_paths(graph_filename) if instances else load_distance_matrix(graph_filename)
+        vehicles_results = []
+        for vehicles_amount in VEHICLES_AMOUNTS:
+            start_time = time.time()
+            # Solve VRP using ALNS
+            best_routes, best_cost = vrp_alns(graph, vehicles_amount)
+            end_time = time.time()
+            execution_time = end_time - start_time
+            if best_routes is not None:
+                best_routes = graph.expand_routes(get_routes(best_routes))
+
+            # Print the best routes, their cost, and execution time
+            print(f"Best routes: {best_routes}")
+            print(f"Total cost: {best_cost}")
+            print(f"Vehicles amount: {vehicles_amount}")
+            print(f"Execution time: {execution_time} seconds\n")
+
+            vehicles_results.append(
+                {
+                    "vehicles_amount": vehicles_amount,
+                    "execution_time": execution_time,
+                    "best_routes": best_routes,
+                    "total_cost": best_cost,
+                }
+            )
+
+            # Save the results
+            results.append(
+                {
+                    "name": graph_filename,
+                    "nodes_count": graph.number_of_nodes(),
+                    "edges_count": graph.number_of_edges(),
+                    "vehicles_amounts": vehicles_results,
+                }
+            )
+
+        # Append the results to the JSON file
+        save_results_to_json(results, OUTPUT_FILENAME)
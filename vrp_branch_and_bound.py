@@ -0,0 +1,204 @@
+import networkx as nx
+import numpy as np
+import itertools
+import sys
+import os
+import time
+from vrp_utils import (
+    load_distance_matrix,
+    as_distance_matrix,
+    optimal_split,
+    customer_lower_bounds,
+    save_results_to_json,
+    StopCondition,
+)
+from vrp_instance_cache import InstanceCache
+from vrp_construction import nearest_neighbor_tour
+
+INPUT_GRAPHS = "5-1000_1"
+INPUT_DIR = f"graphs/{INPUT_GRAPHS}"
+
+OUTPUT_FILENAME = f"results/{INPUT_GRAPHS}_BB.json"
+
+VEHICLES_AMOUNTS = [1, 2, 3, 4]
+SHORTEST_PATHS = False  # Route through intermediate nodes of sparse graphs (see vrp_utils.shortest_path_closure)
+
+# Larger instances are skipped by main(); graph_017 with 4 vehicles takes about 45 s, and graph_020
+# does not finish in minutes (use vrp_held_karp for such graphs)
+MAX_NODES = 17
+
+
+def vrp_branch_and_bound(
+    graph: nx.Graph, vehicles_amount: int, use_all_vehicles: bool = True, stop: StopCondition = None
+) -> tuple:
+    """
+    Solve the Vehicle Routing Problem exactly using branch and bound.
+
+    Routes are built one node at a time. A partial solution is pruned as soon as its cost plus
+    a lower bound on the remaining cost (half of the two cheapest incident edges of every
+    unvisited customer, plus the cheapest depot edges of the routes still to be closed) reaches
+    the incumbent, which is seeded with a nearest-neighbor tour split optimally into routes.
+    Symmetric duplicates are never generated: every route starts with a smaller customer than
+    it ends with, and routes are opened in increasing order of their first customer.
+
+    Parameters:
+    graph (networkx.Graph | DistanceMatrix): The graph
+    vehicles_amount (int): The number of vehicles
+    use_all_vehicles (bool): Require every vehicle to serve at least one customer, like the
+        brute force does, instead of allowing unused vehicles
+    stop (StopCondition): Return the incumbent (not necessarily optimal) once the time limit
+        or the target cost is reached, or when interrupted
+
+    Returns:
+    best_routes (list of lists): The best routes for each vehicle
+    best_cost (int): The total cost of the best routes
+    """
+    distances = as_distance_matrix(graph)
+    weights = distances.weights.tolist()
+    customers = distances.customers()
+    size = distances.number_of_nodes()
+    # Number of routes that have to be opened
+    required = min(vehicles_amount, len(customers)) if use_all_vehicles else 1
+
+    # Lower bound on the share of every unvisited customer in the remaining cost
+    half = customer_lower_bounds(distances).tolist()
+    others = distances.weights + np.diag(np.full(size, np.inf))
+    cheapest = others.min(axis=1).tolist()
+    # Cheapest total of k depot edge ends, every customer being adjacent to the depot at most twice
+    depot_edges = sorted(2 * [weights[0][u] for u in customers])
+    depot_prefix = [0.0] + list(itertools.accumulate(depot_edges))
+    # Candidates from every node, nearest first, so that good solutions are found early
+    order = [sorted(customers, key=lambda u: weights[v][u]) for v in range(size)]
+
+    tour = nearest_neighbor_tour(distances)
+    costs, bounds = optimal_split(
+        distances, np.array([tour], dtype=np.int64), vehicles_amount, use_all_vehicles
+    )
+    best_cost = costs[0]
+    best_routes = [route.tolist() for route in np.split(np.array(tour), bounds[0][:-1])]
+    if stop is not None:
+        stop.record(best_cost)
+
+    visited = [False] * size
+    routes = []
+
+    def lower_bound(current: int, remaining: float) -> float:
+        # The current node still has one edge to go, and the depot two per unopened route
+        # plus the return of the open one
+        future = max(0, required - len(routes))
+        return remaining + (cheapest[current] + depot_prefix[2 * future + 1]) / 2
+
+    def search(current: int, cost: float, remaining: float, unvisited: int):
+        nonlocal best_cost, best_routes
+        if stop is not None and stop.should_stop():
+            return
+        route = routes[-1]
+        canonical = len(route) == 1 or route[0] < route[-1]
+        if unvisited == 0:
+            total = cost + weights[current][0]
+            if total < best_cost and canonical and len(routes) >= required:
+                best_cost = total
+                best_routes = [list(r) for r in routes]
+                if stop is not None:
+                    stop.record(total)
+            return
+
+        # Close the current route and open the next one with a later first customer
+        if len(routes) < vehicles_amount and canonical:
+            closed = cost + weights[current][0]
+            routes.append(None)
+            for u in order[0]:
+                if visited[u] or u < route[0]:
+                    continue
+                new_cost = closed + weights[0][u]
+                if new_cost + lower_bound(u, remaining - half[u]) >= best_cost:
+                    continue
+                visited[u] = True
+                routes[-1] = [u]
+                search(u, new_cost, remaining - half[u], unvisited - 1)
+                visited[u] = False
+            routes.pop()
+
+        # Extend the current route, unless the remaining customers are needed for other routes
+        if unvisited > required - len(routes):
+            for u in order[current]:
+                if visited[u]:
+                    continue
+                new_cost = cost + weights[current][u]
+                if new_cost + lower_bound(u, remaining - half[u]) >= best_cost:
+                    continue
+                visited[u] = True
+                route.append(u)
+                search(u, new_cost, remaining - half[u], unvisited - 1)
+                route.pop()
+                visited[u] = False
+
+    remaining = sum(half)
+    routes.append(None)
+    try:
+        for u in customers:
+            # The first route may start with any customer, later ones only with a larger one
+            if weights[0][u] + lower_bound(u, remaining - half[u]) >= best_cost:
+                continue
+            visited[u] = True
+            routes[-1] = [u]
+            search(u, weights[0][u], remaining - half[u], len(customers) - 1)
+            visited[u] = False
+    except KeyboardInterrupt:
+        # Return the incumbent
+        if stop is None:
+            raise
+        stop.interrupted = True
+
+    if not np.isfinite(best_cost):
+        return None, sys.maxsize
+    best_routes += [[] for _ in range(vehicles_amount - len(best_routes))]
+    return [distances.to_labels([0] + route + [0]) for route in best_routes], int(best_cost)
+
+
+if __name__ == "__main__":
+    results = []
+
+    # Initialize the JSON file
+    save_results_to_json(results, OUTPUT_FILENAME)
+    instances = InstanceCache() if SHORTEST_PATHS else None
+
+    for f in sorted(os.listdir(INPUT_DIR)):
+        graph_filename = os.path.join(INPUT_DIR, f)
+        # Load the graph (or its shortest path closure, cached between runs)
+        graph = instances.shortest_paths(graph_filename) if instances else load_distance_matrix(graph_filename)
+        if graph.number_of_nodes() > MAX_NODES:
+            continue
+        print(f"Processing {graph_filename}")
+        vehicles_results = []
+        for vehicles_amount in VEHICLES_AMOUNTS:
+            start_time = time.time()
+            # Solve VRP using branch and bound
+            best_routes, best_cost = vrp_branch_and_bound(graph, vehicles_amount)
+            end_time = time.time()
+            execution_time = end_time - start_time
+            best_routes = graph.expand_routes(best_routes)
+
+            # Print the best routes, their cost, and execution time
+            print(f"Best routes: {best_routes}")
+            print(f"Total cost: {best_cost}")
+            print(f"Vehicles amount: {vehicles_amount}")
+            print(f"Execution time: {execution_time} seconds\n")
+
+            vehicles_results.append({
+                "vehicles_amount": vehicles_amount,
+                "execution_time": execution_time,
+                "best_routes": best_routes,
+                "total_cost": best_cost
+            })
+
+            # Save the results
+            results.append({
+                "name": graph_filename,
+                "nodes_count": graph.number_of_nodes(),
+                "edges_count": graph.number_of_edges(),
+                "vehicles_amounts": vehicles_results
+            })
+
+        # Append the results to the JSON file
+        save_results_to_json(results, OUTPUT_FILENAME)
@@ -1,10 +1,22 @@
 import networkx as nx
+import numpy as np
 import itertools
 import sys
 import os
 import json
 import time
-from vrp_utils import load_graph, calculate_route_cost, save_results_to_json
+import math
+import multiprocessing
+from vrp_utils import (
+    load_distance_matrix,
+    as_distance_matrix,
+    calculate_tours_cost,
+    customer_lower_bounds,
+    save_results_to_json,
+    StopCondition,
+)
+from vrp_instance_cache import InstanceCache
+from vrp_construction import nearest_neighbor_tour
 
 INPUT_GRAPHS = "5-1000_1"
 INPUT_DIR = f"graphs/{INPUT_GRAPHS}"
@@ -12,34 +24,284 @@ INPUT_DIR = f"graphs/{INPUT_GRAPHS}"
 OUTPUT_FILENAME = f"results/{INPUT_GRAPHS}_BF.json"
 
 VEHICLES_AMOUNTS = [1, 2, 3, 4]
+SHORTEST_PATHS = False  # Route through intermediate nodes of sparse graphs (see vrp_utils.shortest_path_closure)
 
+# Number of permutations evaluated at once
+BATCH_SIZE = 10000
 
+# Number of worker processes used by main()
+WORKERS = os.cpu_count()
 
-def vrp_bruteforce(graph: nx.Graph, vehicles_amount: int) -> tuple:
+# Permutation prefixes are fixed until there are at least this many per worker
+TASKS_PER_WORKER = 8
+
+# State shared by the worker processes, set by _init_worker()
+_worker_distances = None
+_worker_vehicles_amount = None
+_worker_best_cost = None
+_worker_stop = None
+_worker_lower_bounds = None
+_worker_cheapest = None
+
+
+def _round_robin(size: int, vehicles_amount: int) -> tuple:
+    """
+    Reorder permutation positions into giant tours of round-robin routes.
+
+    Returns:
+    order (numpy.ndarray): The permutation position at each giant tour position
+    bounds (numpy.ndarray): The end offset of each route in the giant tour
+    """
+    positions = np.arange(size)
+    order = np.concatenate([positions[i::vehicles_amount] for i in range(vehicles_amount)])
+    bounds = np.cumsum([len(positions[i::vehicles_amount]) for i in range(vehicles_amount)])
+    return order, bounds
+
+
+def _prefix_bound(
+    weights: np.ndarray, cheapest: np.ndarray, prefix: tuple, vehicles_amount: int, size: int
+) -> float:
+    """
+    Lower bound on the cost of the route edges at the nodes of a permutation prefix.
+
+    Position p belongs to route p % vehicles_amount, so every prefix node is preceded either by
+    the depot or by the node vehicles_amount positions earlier, and followed by the node
+    vehicles_amount positions later or, at the end of its route, by the depot. The fixed edges
+    count in full. An edge to a successor not fixed yet counts half of the cheapest edge of the
+    node, the other half being left to the bound of the successor (see customer_lower_bounds()).
+    """
+    cost = 0.0
+    for p, node in enumerate(prefix):
+        previous = prefix[p - vehicles_amount] if p >= vehicles_amount else 0
+        cost += weights[previous][node]
+        if p + vehicles_amount >= size:
+            cost += weights[node][0]
+        elif p + vehicles_amount >= len(prefix):
+            cost += cheapest[node] / 2
+    return cost
+
+
+def _symmetry_pairs(size: int, vehicles_amount: int) -> list:
+    """
+    Position pairs (a, b) whose nodes are in increasing order in a canonical permutation.
+
+    Swapping two routes of equal length, or reversing a route, gives another permutation of the
+    same cost (the weights are symmetric). The first such permutation in lexicographic order,
+    which the serial search returns among equal costs, has the starts of equal-length routes
+    in increasing order and every route starting with a smaller node than it ends with, so the
+    other ones need not be evaluated.
+    """
+    routes = min(vehicles_amount, size)
+    ends = [r + (size - 1 - r) // vehicles_amount * vehicles_amount for r in range(routes)]
+    # The first size % vehicles_amount routes are one node longer than the others
+    pairs = [(r, r + 1) for r in range(routes - 1) if ends[r] - r == ends[r + 1] - r - 1]
+    pairs += [(r, end) for r, end in enumerate(ends) if end != r]
+    return pairs
+
+
+def _seed_cost(distances, vehicles_amount: int) -> float:
+    """
+    Cost of the nearest-neighbor tour cut into the route lengths of the round-robin assignment.
+
+    Some permutation gives exactly these routes, so the cost bounds the best one from above.
+    """
+    tour = np.array([nearest_neighbor_tour(distances)], dtype=np.int64)
+    _, bounds = _round_robin(tour.shape[1], vehicles_amount)
+    return float(calculate_tours_cost(distances, tour, bounds)[0])
+
+
+def _init_worker(distances, vehicles_amount: int, best_cost, stop):
+    global _worker_distances, _worker_vehicles_amount, _worker_best_cost, _worker_stop
+    global _worker_lower_bounds, _worker_cheapest
+    _worker_distances = distances
+    _worker_vehicles_amount = vehicles_amount
+    _worker_best_cost = best_cost
+    _worker_stop = stop
+    _worker_lower_bounds = customer_lower_bounds(distances)
+    _worker_cheapest = (distances.weights + np.diag(np.full(distances.number_of_nodes(), np.inf))).min(axis=1)
+
+
+def _search_prefix(prefix: tuple) -> tuple:
+    """
+    Evaluate every permutation starting with a prefix, in a worker process.
+
+    A subtree of permutations is abandoned as soon as the bound of its prefix (see
+    _prefix_bound()) plus the lower bounds of the customers not in it (see
+    customer_lower_bounds()) and the depot halves of the route starts and ends among them
+    exceeds the best cost found by any worker, or as soon as its prefix is not canonical (see
+    _symmetry_pairs()). Subtrees too large for one batch are split by fixing one more
+    position, in permutation order, so both are checked again on every level, and only the
+    canonical rows of a batch are evaluated. Subtrees whose bound only equals the best cost
+    are still searched, so that ties are resolved the same way as in the serial search. With
+    stopping criteria, the search is also abandoned once they are met by the best cost of all
+    workers.
+
+    Returns:
+    best_cost (float): The best cost found (inf if none)
+    best_perm (tuple): The best permutation (None if none)
+    """
+    distances = _worker_distances
+    vehicles_amount = _worker_vehicles_amount
+    weights = distances.weights
+    best_cost = np.inf
+    best_perm = None
+    stopped = False
+
+    nodes = [node for node in distances.customers() if node not in prefix]
+    order, bounds = _round_robin(len(prefix) + len(nodes), vehicles_amount)
+    pairs = _symmetry_pairs(len(prefix) + len(nodes), vehicles_amount)
+
+    def search(prefix: tuple, rest: list):
+        nonlocal best_cost, best_perm, stopped
+        if any(b < len(prefix) and prefix[a] > prefix[b] for a, b in pairs):
+            return
+        size = len(prefix) + len(rest)
+        bound = _prefix_bound(weights, _worker_cheapest, prefix, vehicles_amount, size)
+        bound += _worker_lower_bounds[rest].sum()
+        # The depot halves of the route starts and ends at positions not fixed yet, every
+        # remaining customer being adjacent to the depot at most twice
+        routes = min(vehicles_amount, size)
+        depot_ends = max(0, routes - len(prefix)) + size - max(len(prefix), size - routes)
+        if depot_ends:
+            bound += np.repeat(np.sort(weights[0, rest]), 2)[:depot_ends].sum() / 2
+        if stopped or bound > _worker_best_cost.value:
+            return
+        if math.factorial(len(rest)) > BATCH_SIZE:
+            for i, node in enumerate(rest):
+                search(prefix + (node,), rest[:i] + rest[i + 1 :])
+            return
+
+        tail = np.array(list(itertools.permutations(rest)), dtype=np.int64)
+        head = np.array(prefix, dtype=np.int64)
+        batch = np.hstack((np.broadcast_to(head, (len(tail), len(head))), tail.reshape(len(tail), -1)))
+        canonical = np.ones(len(batch), dtype=bool)
+        for a, b in pairs:
+            canonical &= batch[:, a] < batch[:, b]
+        batch = batch[canonical]
+        if len(batch) == 0:
+            return
+        costs = calculate_tours_cost(distances, batch[:, order], bounds)
+        best = int(np.argmin(costs))
+        if costs[best] < best_cost:
+            best_cost = costs[best]
+            best_perm = tuple(batch[best].tolist())
+            with _worker_best_cost.get_lock():
+                if best_cost < _worker_best_cost.value:
+                    _worker_best_cost.value = best_cost
+        if _worker_stop is not None:
+            _worker_stop.record(_worker_best_cost.value)
+            stopped = _worker_stop.should_stop()
+
+    search(tuple(prefix), nodes)
+    return best_cost, best_perm
+
+
+def _parallel_bruteforce(distances, vehicles_amount: int, workers: int, stop: StopCondition = None) -> tuple:
+    """
+    Search all permutations in a process pool, one task per fixed permutation prefix.
+
+    The workers share the best cost found so far, starting from the cost of a nearest-neighbor
+    solution, and skip prefixes that cannot beat it. The
+    results are merged by cost and then by permutation order, which gives the same answer as
+    the serial search. With stopping criteria, the results collected so far are merged once
+    they are met or the search is interrupted.
+
+    Returns:
+    best_cost (float): The best cost found (inf if none)
+    best_perm (tuple): The best permutation (None if none)
+    """
+    nodes = distances.customers()
+    length = 0
+    tasks = 1
+    while length < len(nodes) and tasks < workers * TASKS_PER_WORKER:
+        tasks *= len(nodes) - length
+        length += 1
+    prefixes = itertools.permutations(nodes, length)
+
+    # Seeded with a feasible cost, so that the workers prune from the start
+    best_cost = multiprocessing.Value("d", _seed_cost(distances, vehicles_amount))
+    results = []
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(distances, vehicles_amount, best_cost, stop)
+    ) as pool:
+        try:
+            for cost, perm in pool.imap_unordered(_search_prefix, prefixes):
+                if perm is not None:
+                    results.append((cost, perm))
+                if stop is not None:
+                    stop.record(cost)
+                    if stop.should_stop():
+                        break
+        except KeyboardInterrupt:
+            # Merge the results collected so far
+            if stop is None:
+                raise
+            stop.interrupted = True
+    if not results:
+        return np.inf, None
+    return min(results)
+
+
+def vrp_bruteforce(
+    graph: nx.Graph, vehicles_amount: int, workers: int = 1, stop: StopCondition = None
+) -> tuple:
     """
     Solve the Vehicle Routing Problem using brute force.
 
+    Permutations are evaluated in batches on the distance matrix. With more than one worker
+    the permutations are split by their prefixes between worker processes.
+
     Parameters:
-    graph (networkx.Graph): The graph
+    graph (networkx.Graph | DistanceMatrix): The graph
     vehicles_amount (int): The number of vehicles
+    workers (int): The number of worker processes
+    stop (StopCondition): Return the best permutation so far once these criteria are met,
+        patience being counted in batches, or when interrupted
 
     Returns:
     best_routes (list of lists): The best routes for each vehicle
     best_cost (int): The total cost of the best routes
     """
-    nodes = list(graph.nodes)
-    nodes.remove('A')  # Remove 'A' from nodes to ensure it is only used as start and end
+    distances = as_distance_matrix(graph)
+    nodes = distances.customers()  # The depot is only used as start and end
     best_cost = sys.maxsize
-    best_routes = None
+    best_perm = None
 
-    for perm in itertools.permutations(nodes):
-        routes = [['A'] + list(perm[i::vehicles_amount]) + ['A'] for i in range(vehicles_amount)]
-        cost = sum(calculate_route_cost(graph, route) for route in routes)
-        if cost < best_cost:
-            best_cost = cost
-            best_routes = routes
+    if workers > 1:
+        cost, best_perm = _parallel_bruteforce(distances, vehicles_amount, workers, stop)
+        if best_perm is not None:
+            best_cost = int(cost)
+            best_perm = np.array(best_perm, dtype=np.int64)
+    else:
+        order, bounds = _round_robin(len(nodes), vehicles_amount)
+        permutations = itertools.permutations(nodes)
+        try:
+            while True:
+                batch = np.array(list(itertools.islice(permutations, BATCH_SIZE)), dtype=np.int64)
+                if len(batch) == 0:
+                    break
+                costs = calculate_tours_cost(distances, batch[:, order], bounds)
+                best = int(np.argmin(costs))
+                if costs[best] < best_cost:
+                    best_cost = int(costs[best])
+                    best_perm = batch[best]
+                if stop is not None:
+                    stop.record(costs[best])
+                    if stop.should_stop():
+                        break
+        except KeyboardInterrupt:
+            # Return the best permutation so far
+            if stop is None or best_perm is None:
+                raise
+            stop.interrupted = True
 
-    return best_routes, best_cost
+    if best_perm is None:
+        return None, best_cost
+    routes = [
+        distances.to_labels([0] + list(best_perm[i::vehicles_amount]) + [0])
+        for i in range(vehicles_amount)
+    ]
+    return routes, best_cost
 
 
 if __name__ == "__main__":
@@ -47,19 +309,21 @@ if __name__ == "__main__":
 
     # Initialize the JSON file
     save_results_to_json(results, OUTPUT_FILENAME)
+    instances = InstanceCache() if SHORTEST_PATHS else None
     
     for f in sorted(os.listdir(INPUT_DIR)):
         graph_filename = os.path.join(INPUT_DIR, f)
         print(f"Processing {graph_filename}")
-        # Load the graph
-        graph = load_graph(graph_filename)
+        # Load the graph (or its shortest path closure, cached between runs)
+        graph = instances.shortest_paths(graph_filename) if instances else load_distance_matrix(graph_filename)
         vehicles_results = []
         for vehicles_amount in VEHICLES_AMOUNTS:
             start_time = time.time()
             # Solve VRP using brute force
-            best_routes, best_cost = vrp_bruteforce(graph, vehicles_amount)
+            best_routes, best_cost = vrp_bruteforce(graph, vehicles_amount, WORKERS)
             end_time = time.time()
             execution_time = end_time - start_time
+            best_routes = graph.expand_routes(best_routes)
 
             # Print the best routes, their cost, and execution time
             print(f"Best routes: {best_routes}")
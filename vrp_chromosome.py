@@ -0,0 +1,105 @@
+import numpy as np
+
+from vrp_utils import DistanceMatrix, split_tour
+
+# Node ids never exceed the number of nodes, so 32 bits are plenty
+NODE_DTYPE = np.int32
+
+
+class Chromosome:
+    """
+    A solution encoded as a giant tour of node ids plus the route end offsets of each vehicle.
+
+    Both arrays may be views into a population buffer, so chromosomes are mutated in place
+    and only converted to labeled routes when the results are written.
+    """
+
+    __slots__ = ("tour", "bounds")
+
+    def __init__(self, tour: np.ndarray, bounds: np.ndarray):
+        self.tour = tour
+        self.bounds = bounds
+
+    @classmethod
+    def from_routes(cls, routes: list) -> "Chromosome":
+        """
+        Create a chromosome from a list of routes of node ids (without the depot).
+        """
+        chromosome = cls(
+            np.empty(sum(len(route) for route in routes), dtype=NODE_DTYPE),
+            np.empty(len(routes), dtype=NODE_DTYPE),
+        )
+        chromosome.set_routes(routes)
+        return chromosome
+
+    def set_routes(self, routes: list):
+        """
+        Overwrite the chromosome in place with a list of routes of node ids.
+        """
+        start = 0
+        for i, route in enumerate(routes):
+            self.tour[start : start + len(route)] = route
+            start += len(route)
+            self.bounds[i] = start
+
+    def copy_from(self, other: "Chromosome"):
+        """
+        Overwrite the chromosome in place with the contents of another one.
+        """
+        self.tour[:] = other.tour
+        self.bounds[:] = other.bounds
+
+    def copy(self) -> "Chromosome":
+        return Chromosome(self.tour.copy(), self.bounds.copy())
+
+    def swap(self, i: int, j: int):
+        """
+        Swap the nodes at two positions of the giant tour in place.
+        """
+        self.tour[i], self.tour[j] = self.tour[j], self.tour[i]
+
+    def routes(self) -> list[np.ndarray]:
+        return split_tour(self.tour, self.bounds)
+
+    def to_labels(self, distances: DistanceMatrix) -> list[list[str]]:
+        """
+        Convert the chromosome to routes of node labels (without the depot).
+        """
+        return [distances.to_labels(route.tolist()) for route in self.routes()]
+
+
+class Population:
+    """
+    A fixed-size population stored as one 2-D buffer of giant tours and one of route bounds.
+
+    The individuals are chromosome views into the rows of these buffers, so the whole
+    population can be evaluated at once and reused across generations without reallocation.
+    """
+
+    __slots__ = ("tours", "bounds", "costs", "individuals")
+
+    def __init__(self, size: int, tour_length: int, vehicles_amount: int):
+        self.tours = np.zeros((size, tour_length), dtype=NODE_DTYPE)
+        self.bounds = np.zeros((size, vehicles_amount), dtype=NODE_DTYPE)
+        self.costs = np.full(size, np.inf)
+        self.individuals = [Chromosome(self.tours[i], self.bounds[i]) for i in range(size)]
+
+    def __len__(self) -> int:
+        return len(self.individuals)
+
+    def __getitem__(self, i: int) -> Chromosome:
+        return self.individuals[i]
+
+    def __iter__(self):
+        return iter(self.individuals)
+
+    def positions(self) -> np.ndarray:
+        """
+        Return the position of every node in every giant tour (individuals x nodes).
+
+        The rows are the inverse permutations of the tours (the depot column is unused), built
+        for the whole population in one vectorized scatter.
+        """
+        positions = np.zeros((len(self), self.tours.shape[1] + 1), dtype=NODE_DTYPE)
+        np.put_along_axis(positions, self.tours, np.arange(self.tours.shape[1], dtype=NODE_DTYPE), axis=1)
+        return positions
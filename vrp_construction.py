@@ -0,0 +1,277 @@
+import random
+import functools
+import numpy as np
+
+from vrp_utils import DistanceMatrix, EuclideanWeights, optimal_split, nearest_neighbors
+
+# Chunk of the sorted savings converted to Python ints at a time
+SAVINGS_CHUNK = 10000
+# Candidate pairs per customer of the savings algorithm on coordinate instances with on-demand distances
+SAVINGS_NEIGHBORS = 20
+
+
+def nearest_neighbor_tour(distances: DistanceMatrix, start: int = None) -> list:
+    """
+    Build a giant tour by always visiting the nearest unvisited customer.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    start (int): The first customer (None = the nearest one to the depot)
+
+    Returns:
+    tour (list): The customers in visiting order
+    """
+    weights = distances.weights
+    unvisited = np.ones(distances.number_of_nodes(), dtype=bool)
+    unvisited[0] = False
+    tour = []
+    current = 0
+    if start is not None:
+        current = start
+        unvisited[start] = False
+        tour.append(start)
+    for _ in range(np.count_nonzero(unvisited)):
+        current = int(np.argmin(np.where(unvisited, weights[current], np.inf)))
+        unvisited[current] = False
+        tour.append(current)
+    return tour
+
+
+def nearest_neighbor_routes(distances: DistanceMatrix, vehicles_amount: int) -> list:
+    """
+    Build routes from a nearest-neighbor tour starting at a random customer, split optimally.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    vehicles_amount (int): The number of vehicles
+
+    Returns:
+    routes (list of lists): The customer ids of every non-empty route
+    """
+    customers = distances.customers()
+    if not customers:
+        return []
+    tour = np.array(nearest_neighbor_tour(distances, random.choice(customers)))
+    _, bounds = optimal_split(distances, tour[None, :], vehicles_amount, use_all_vehicles=True)
+    return [route.tolist() for route in np.split(tour, bounds[0][:-1]) if len(route)]
+
+
+def cheapest_insertion_routes(distances: DistanceMatrix, vehicles_amount: int) -> list:
+    """
+    Build routes by cheapest insertion, starting from random single-customer routes.
+
+    Every step inserts the customer with the cheapest insertion into any edge of any route.
+    The best edge of every customer is cached and only compared with the two edges created by
+    an insertion; it is recomputed over all edges only for the customers whose best edge was
+    the one replaced.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    vehicles_amount (int): The number of vehicles
+
+    Returns:
+    routes (list of lists): The customer ids of every route
+    """
+    weights = distances.weights
+    customers = distances.customers()
+    size = distances.number_of_nodes()
+    seeds = random.sample(customers, min(vehicles_amount, len(customers)))
+
+    # Edges (start, end, route), the depot being both the start and the end of every route
+    capacity = 2 * (len(seeds) + size)
+    starts = np.zeros(capacity, dtype=np.int64)
+    ends = np.zeros(capacity, dtype=np.int64)
+    owners = np.zeros(capacity, dtype=np.int64)
+    active = np.zeros(capacity, dtype=bool)
+    count = 0
+    # Linked routes: the first customer of every route and the successor of every customer
+    first = list(seeds)
+    successor = [0] * size
+    for route, seed in enumerate(seeds):
+        for a, b in ((0, seed), (seed, 0)):
+            starts[count], ends[count], owners[count] = a, b, route
+            active[count] = True
+            count += 1
+
+    def insertion_costs(nodes: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        a, b = starts[edges], ends[edges]
+        with np.errstate(invalid="ignore"):
+            costs = weights[a[None, :], nodes[:, None]] + weights[nodes[:, None], b[None, :]] - weights[a, b][None, :]
+        return np.where(np.isnan(costs), np.inf, costs)
+
+    pending = np.zeros(size, dtype=bool)
+    pending[customers] = True
+    pending[seeds] = False
+    best_cost = np.full(size, np.inf)
+    best_edge = np.zeros(size, dtype=np.int64)
+    nodes = np.flatnonzero(pending)
+    if len(nodes) and count:
+        costs = insertion_costs(nodes, np.arange(count))
+        best_edge[nodes] = np.argmin(costs, axis=1)
+        best_cost[nodes] = costs[np.arange(len(nodes)), best_edge[nodes]]
+
+    for _ in range(len(nodes) if count else 0):
+        node = int(np.argmin(np.where(pending, best_cost, np.inf)))
+        if not pending[node]:
+            # Only customers unreachable by any edge remain
+            node = int(np.flatnonzero(pending)[0])
+        pending[node] = False
+        edge = int(best_edge[node])
+        a, b, route = int(starts[edge]), int(ends[edge]), int(owners[edge])
+        if a == 0:
+            first[route] = node
+        else:
+            successor[a] = node
+        successor[node] = b
+        active[edge] = False
+        new_edges = np.array([count, count + 1])
+        starts[new_edges], ends[new_edges], owners[new_edges] = (a, node), (node, b), route
+        active[new_edges] = True
+        count += 2
+
+        remaining = np.flatnonzero(pending)
+        if len(remaining) == 0:
+            break
+        # Customers that lost their best edge look at all edges again, the others at the new ones
+        lost = remaining[best_edge[remaining] == edge]
+        if len(lost):
+            edges = np.flatnonzero(active[:count])
+            costs = insertion_costs(lost, edges)
+            best = np.argmin(costs, axis=1)
+            best_edge[lost] = edges[best]
+            best_cost[lost] = costs[np.arange(len(lost)), best]
+        costs = insertion_costs(remaining, new_edges)
+        best = np.argmin(costs, axis=1)
+        better = costs[np.arange(len(remaining)), best] < best_cost[remaining]
+        best_edge[remaining[better]] = new_edges[best[better]]
+        best_cost[remaining[better]] = costs[np.arange(len(remaining)), best][better]
+
+    routes = []
+    for node in first:
+        route = []
+        while node != 0:
+            route.append(node)
+            node = successor[node]
+        routes.append(route)
+    return routes
+
+
+def _find(parent: list, node: int) -> int:
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]  # Path halving
+        node = parent[node]
+    return node
+
+
+def _savings_order(weights, left: np.ndarray, right: np.ndarray, noise: float) -> np.ndarray:
+    """
+    Order pairs of customers by decreasing saving.
+    """
+    with np.errstate(invalid="ignore"):
+        savings = weights[0, left] + weights[0, right] - weights[left, right]
+    if noise:
+        savings *= np.random.default_rng(random.getrandbits(32)).uniform(1 - noise, 1 + noise, len(savings))
+    savings[np.isnan(savings)] = -np.inf
+    return np.argsort(-savings, kind="stable")
+
+
+def _join_routes(
+    parent: list, adjacent: list, left: np.ndarray, right: np.ndarray, order: np.ndarray, routes: int, vehicles_amount: int
+) -> int:
+    """
+    Join routes by the pairs of customers in the given order, returning the number of routes left.
+    """
+    for chunk in range(0, len(order), SAVINGS_CHUNK):
+        if routes <= vehicles_amount:
+            break
+        pairs = order[chunk : chunk + SAVINGS_CHUNK]
+        for i, j in zip(left[pairs].tolist(), right[pairs].tolist()):
+            # Only the ends of two different routes can be joined
+            if len(adjacent[i]) > 1 or len(adjacent[j]) > 1:
+                continue
+            root_i, root_j = _find(parent, i), _find(parent, j)
+            if root_i == root_j:
+                continue
+            parent[root_i] = root_j
+            adjacent[i].append(j)
+            adjacent[j].append(i)
+            routes -= 1
+            if routes <= vehicles_amount:
+                break
+    return routes
+
+
+def savings_routes(distances: DistanceMatrix, vehicles_amount: int, noise: float = 0.0) -> list:
+    """
+    Build routes with the Clarke-Wright savings algorithm.
+
+    Every customer starts on its own route. Pairs of customers are visited by decreasing saving
+    w(0, i) + w(0, j) - w(i, j), and the routes of i and j are joined by the edge (i, j) whenever
+    both are route ends of different routes, tracked with a union-find over the customers.
+    Without capacities, merging stops once vehicles_amount routes are left. The savings never
+    change, so a single argsort serves as the priority queue.
+
+    On coordinate instances with on-demand distances, only the pairs of each customer with its
+    SAVINGS_NEIGHBORS nearest customers are considered at first, and the routes still left are
+    then joined by the pairs of their ends, so no quadratic list of pairs is ever built.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    vehicles_amount (int): The number of vehicles
+    noise (float): Scale every saving by a random factor in [1 - noise, 1 + noise], so that
+        repeated calls give different routes
+
+    Returns:
+    routes (list of lists): The customer ids of every route
+    """
+    weights = distances.weights
+    customers = distances.customers()
+    size = distances.number_of_nodes()
+    count = len(customers)
+
+    if isinstance(weights, EuclideanWeights):
+        neighbors = nearest_neighbors(distances, SAVINGS_NEIGHBORS)[1:].astype(np.int64)
+        left = np.repeat(np.arange(1, size), neighbors.shape[1])
+        right = neighbors.ravel()
+        pairs = np.unique(np.minimum(left, right) * size + np.maximum(left, right))
+        left, right = pairs // size, pairs % size
+    else:
+        left, right = np.triu_indices(count, k=1)
+        left += 1
+        right += 1
+
+    parent = list(range(size))
+    adjacent = [[] for _ in range(size)]
+    routes = _join_routes(
+        parent, adjacent, left, right, _savings_order(weights, left, right, noise), count, vehicles_amount
+    )
+    if routes > vehicles_amount and isinstance(weights, EuclideanWeights):
+        ends = np.array([node for node in customers if len(adjacent[node]) < 2])
+        left, right = np.triu_indices(len(ends), k=1)
+        left, right = ends[left], ends[right]
+        _join_routes(parent, adjacent, left, right, _savings_order(weights, left, right, noise), routes, vehicles_amount)
+
+    result = []
+    visited = [False] * size
+    for node in customers:
+        if visited[node] or len(adjacent[node]) > 1:
+            continue
+        # Walk the route from one of its ends
+        route = []
+        previous = 0
+        while True:
+            route.append(node)
+            visited[node] = True
+            following = [n for n in adjacent[node] if n != previous]
+            if not following:
+                break
+            previous, node = node, following[0]
+        result.append(route)
+    return result
+
+
+CONSTRUCTION_HEURISTICS = {
+    "nearest_neighbor": nearest_neighbor_routes,
+    "cheapest_insertion": cheapest_insertion_routes,
+    "savings": functools.partial(savings_routes, noise=0.1),
+}
@@ -0,0 +1,154 @@
+import random
+import numpy as np
+
+
+def order_crossover(p1: np.ndarray, p2: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    Perform order crossover (OX) between two parents to produce a child.
+
+    The child inherits a random segment of the first parent, and the remaining positions are
+    filled with the nodes of the second parent in their original order. Nodes that are already
+    placed are looked up in a boolean table indexed by node id, so the operator runs in O(n).
+
+    Args:
+        p1 (np.ndarray): The giant tour of the first parent.
+        p2 (np.ndarray): The giant tour of the second parent.
+        out (np.ndarray, optional): The array to write the child into.
+
+    Returns:
+        np.ndarray: The giant tour of the child.
+    """
+    size = len(p1)
+    child = np.empty_like(p1) if out is None else out
+    if size < 2:
+        child[:] = p1
+        return child
+
+    # Choose two random points for the crossover
+    start, end = sorted(random.sample(range(size), 2))
+
+    # Copy the segment from the first parent to the child
+    child[start:end] = p1[start:end]
+    placed = np.zeros(size + 1, dtype=bool)
+    placed[p1[start:end]] = True
+
+    # Fill the remaining positions with nodes from the second parent
+    remaining = p2[~placed[p2]]
+    child[:start] = remaining[:start]
+    child[end:] = remaining[start:]
+    return child
+
+
+def partially_mapped_crossover(p1: np.ndarray, p2: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    Perform partially mapped crossover (PMX) between two parents to produce a child.
+
+    The child inherits a random segment of the first parent and the remaining positions of the
+    second parent. Duplicates are resolved by following the mapping defined by the segment,
+    using a position table indexed by node id. The mapping chains are disjoint, so resolving
+    all conflicts takes O(n) in total.
+
+    Args:
+        p1 (np.ndarray): The giant tour of the first parent.
+        p2 (np.ndarray): The giant tour of the second parent.
+        out (np.ndarray, optional): The array to write the child into.
+
+    Returns:
+        np.ndarray: The giant tour of the child.
+    """
+    size = len(p1)
+    child = np.empty_like(p1) if out is None else out
+    if size < 2:
+        child[:] = p1
+        return child
+
+    start, end = sorted(random.sample(range(size), 2))
+
+    child[:] = p2
+    child[start:end] = p1[start:end]
+
+    # Position of every node in the first parent, and whether it lies in the segment
+    position = np.empty(size + 1, dtype=np.int64)
+    position[p1] = np.arange(size)
+    in_segment = np.zeros(size + 1, dtype=bool)
+    in_segment[p1[start:end]] = True
+
+    # Only the nodes of the second parent that are already in the segment are conflicts
+    conflicts = np.flatnonzero(in_segment[p2])
+    conflicts = conflicts[(conflicts < start) | (conflicts >= end)].tolist()
+    parent2 = p2.tolist()
+    position = position.tolist()
+    in_segment = in_segment.tolist()
+    for i in conflicts:
+        node = parent2[i]
+        while in_segment[node]:
+            node = parent2[position[node]]
+        child[i] = node
+    return child
+
+
+def edge_recombination_crossover(p1: np.ndarray, p2: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    Perform edge recombination crossover (ERX) between two parents to produce a child.
+
+    The child is built node by node, preferring nodes adjacent to the current one in either
+    parent and, among them, the one with the fewest remaining neighbors. Every node has at
+    most four neighbors and unvisited nodes are kept in an indexed list with O(1) removal,
+    so the operator runs in O(n).
+
+    Args:
+        p1 (np.ndarray): The giant tour of the first parent.
+        p2 (np.ndarray): The giant tour of the second parent.
+        out (np.ndarray, optional): The array to write the child into.
+
+    Returns:
+        np.ndarray: The giant tour of the child.
+    """
+    size = len(p1)
+    child = np.empty_like(p1) if out is None else out
+    if size < 2:
+        child[:] = p1
+        return child
+
+    # Build the (cyclic) adjacency of both parents
+    neighbors = [set() for _ in range(size + 1)]
+    for parent in (p1.tolist(), p2.tolist()):
+        for a, b in zip(parent, parent[1:] + parent[:1]):
+            if a != b:
+                neighbors[a].add(b)
+                neighbors[b].add(a)
+
+    unvisited = p1.tolist()
+    position = [0] * (size + 1)
+    for i, node in enumerate(unvisited):
+        position[node] = i
+
+    current = unvisited[0]
+    for i in range(size):
+        child[i] = current
+
+        # Remove the current node from the unvisited list in O(1)
+        last = unvisited.pop()
+        if last != current:
+            unvisited[position[current]] = last
+            position[last] = position[current]
+
+        for node in neighbors[current]:
+            neighbors[node].discard(current)
+        if not unvisited:
+            break
+
+        candidates = neighbors[current]
+        if candidates:
+            fewest = min(len(neighbors[node]) for node in candidates)
+            current = random.choice([node for node in candidates if len(neighbors[node]) == fewest])
+        else:
+            current = random.choice(unvisited)
+    return child
+
+
+CROSSOVER_OPERATORS = {
+    "ox": order_crossover,
+    "pmx": partially_mapped_crossover,
+    "erx": edge_recombination_crossover,
+}
@@ -0,0 +1,91 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from vrp_utils import DistanceMatrix, EuclideanWeights, calculate_tours_cost, optimal_split
+
+# Distance matrix of a worker process, attached once by _attach()
+_worker_memory = None
+_worker_distances = None
+
+
+def _attach(name: str, shape: tuple, labels: list, coordinates: bool = False):
+    """
+    Attach a worker process to the distance matrix (or the node coordinates) in shared memory.
+    """
+    global _worker_memory, _worker_distances
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    weights = np.ndarray(shape, dtype=np.float64, buffer=_worker_memory.buf)
+    if coordinates:
+        weights = EuclideanWeights(weights)
+    _worker_distances = DistanceMatrix(labels, weights)
+
+
+def _evaluate_chunk(task: tuple) -> tuple:
+    """
+    Evaluate a chunk of giant tours in a worker process.
+
+    Args:
+        task (tuple): The tours, their route bounds and whether to split them optimally.
+
+    Returns:
+        tuple: The costs and the (possibly new) route bounds of the tours.
+    """
+    tours, bounds, split = task
+    if split:
+        costs, bounds = optimal_split(_worker_distances, tours, bounds.shape[1], use_all_vehicles=True)
+    else:
+        costs = calculate_tours_cost(_worker_distances, tours, bounds)
+    return costs, bounds
+
+
+class EvaluationPool:
+    """
+    A process pool evaluating populations on a distance matrix held in shared memory.
+
+    The weights are copied into shared memory once and every worker attaches to them when it
+    starts, so only the int32 tour and bound buffers of each chunk are sent per evaluation.
+    For weights computed from coordinates, only the coordinates are shared.
+    Use it as a context manager, or call close() to stop the workers and free the memory.
+    """
+
+    def __init__(self, distances: DistanceMatrix, workers: int):
+        coordinates = isinstance(distances.weights, EuclideanWeights)
+        weights = distances.weights.coordinates if coordinates else distances.weights
+        self.memory = shared_memory.SharedMemory(create=True, size=max(weights.nbytes, 1))
+        np.ndarray(weights.shape, dtype=np.float64, buffer=self.memory.buf)[:] = weights
+        self.workers = workers
+        self.pool = multiprocessing.Pool(
+            workers, initializer=_attach, initargs=(self.memory.name, weights.shape, distances.labels, coordinates)
+        )
+
+    def evaluate(self, tours: np.ndarray, bounds: np.ndarray, split: bool = False) -> tuple:
+        """
+        Evaluate giant tours in parallel, one chunk of rows per worker.
+
+        Args:
+            tours (np.ndarray): Giant tours, one per row.
+            bounds (np.ndarray): Route end offsets, one row per tour.
+            split (bool): Split the tours optimally instead of using the given bounds.
+
+        Returns:
+            tuple: The cost and the route bounds of every tour.
+        """
+        chunks = zip(np.array_split(tours, self.workers), np.array_split(bounds, self.workers))
+        results = self.pool.map(_evaluate_chunk, [(t, b, split) for t, b in chunks if len(t)])
+        costs = np.concatenate([costs for costs, _ in results])
+        bounds = np.concatenate([bounds for _, bounds in results])
+        return costs, bounds
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self) -> "EvaluationPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,117 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from vrp_utils import DistanceMatrix, calculate_route_cost_matrix, split_tour
+
+
+class FitnessCache:
+    """
+    A bounded LRU cache of solution costs, keyed by a hash of the integer giant tour.
+
+    Whole solutions are cached by their tour and route bounds (or by their tour alone when the
+    bounds are chosen by the evaluation, as with the optimal Split), and single routes by their
+    node ids, so a solution differing from a cached one in a few routes only pays for those.
+    The least recently used entries are evicted once a table is full. Hits and misses are
+    counted for the run output.
+    """
+
+    def __init__(self, max_size: int = 100000, max_routes: int = None):
+        self.max_size = max_size
+        self.max_routes = max_size if max_routes is None else max_routes
+        self.solutions = OrderedDict()
+        self.routes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.route_hits = 0
+        self.route_misses = 0
+
+    @staticmethod
+    def key(*arrays) -> bytes:
+        """
+        Hash integer arrays into a short key, independent of their dtype.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for array in arrays:
+            digest.update(np.ascontiguousarray(array, dtype=np.int32).tobytes())
+            digest.update(b"|")
+        return digest.digest()
+
+    @staticmethod
+    def _lookup(table: OrderedDict, key: bytes):
+        value = table.get(key)
+        if value is not None:
+            table.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _store(table: OrderedDict, key: bytes, value, max_size: int):
+        table[key] = value
+        if len(table) > max_size:
+            table.popitem(last=False)
+
+    def route_cost(self, distances: DistanceMatrix, route: np.ndarray) -> float:
+        """
+        Return the cost of a single route (without the depot), computing it on a miss.
+        """
+        key = self.key(route)
+        cost = self._lookup(self.routes, key)
+        if cost is None:
+            self.route_misses += 1
+            cost = float(calculate_route_cost_matrix(distances, np.asarray(route)[None, :])[0])
+            self._store(self.routes, key, cost, self.max_routes)
+        else:
+            self.route_hits += 1
+        return cost
+
+    def tours_cost(self, distances: DistanceMatrix, tours: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+        """
+        Return the total cost of giant tours with fixed route bounds from their route costs.
+        """
+        return np.array(
+            [
+                sum(self.route_cost(distances, route) for route in split_tour(tour, tour_bounds))
+                for tour, tour_bounds in zip(tours, bounds)
+            ]
+        )
+
+    def evaluate(self, tours: np.ndarray, bounds: np.ndarray, evaluator, split: bool = False) -> tuple:
+        """
+        Evaluate giant tours, only passing the ones missing from the cache to the evaluator.
+
+        Args:
+            tours (np.ndarray): Giant tours, one per row.
+            bounds (np.ndarray): Route end offsets, one row per tour.
+            evaluator (callable): Maps tours and bounds of the misses to their costs and bounds.
+            split (bool): The evaluator chooses the bounds itself, so they are not part of the key.
+
+        Returns:
+            tuple: The cost and the route bounds of every tour.
+        """
+        costs = np.empty(len(tours))
+        bounds = bounds.copy()
+        keys = [self.key(tour) if split else self.key(tour, tour_bounds) for tour, tour_bounds in zip(tours, bounds)]
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self._lookup(self.solutions, key)
+            if cached is None:
+                missing.append(i)
+            else:
+                costs[i], bounds[i] = cached
+        self.hits += len(tours) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            costs[missing], bounds[missing] = evaluator(tours[missing], bounds[missing])
+            for i in missing:
+                self._store(self.solutions, keys[i], (costs[i], bounds[i].copy()), self.max_size)
+        return costs, bounds
+
+    def stats(self) -> dict:
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "route_cache_hits": self.route_hits,
+            "route_cache_misses": self.route_misses,
+        }
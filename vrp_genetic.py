@@ -1,18 +1,36 @@
 import networkx as nx
+import numpy as np
 import random
+import sys
 import os
 import json
 import time
+import heapq
+import signal
+import queue
+import multiprocessing
 
 from vrp_utils import (
-    load_graph,
-    calculate_route_cost,
+    load_distance_matrix,
+    as_distance_matrix,
+    calculate_tours_cost,
+    optimal_split,
+    nearest_neighbors,
+    customer_lower_bounds,
+    shortest_path_closure,
+    DistanceMatrix,
+    StopCondition,
     save_results_to_json,
     get_route,
     get_routes,
-    couple_routes,
-    decouple_routes,
 )
+from vrp_chromosome import Chromosome, Population
+from vrp_crossover import CROSSOVER_OPERATORS
+from vrp_local_search import local_search
+from vrp_evaluation_pool import EvaluationPool
+from vrp_fitness_cache import FitnessCache
+from vrp_construction import CONSTRUCTION_HEURISTICS
+from vrp_instance_cache import InstanceCache
 
 # GENETIC PARAMS
 # POPULATION_SIZE = 100
@@ -25,6 +43,8 @@ INPUT_GRAPHS = "5-1000_1"
 INPUT_DIR = f"graphs/{INPUT_GRAPHS}"
 # OUTPUT_FILENAME = f"results/{INPUT_GRAPHS}_GA_p{POPULATION_SIZE}_g{GENERATIONS}_m{str(MUTATION_RATE).replace('.','')}_t{TOURNAMENT_SIZE}.json"
 VEHICLES_AMOUNTS = [4]
+INSTANCE_CACHE_DIR = ".vrp_cache"  # Keep parsed graphs and neighbor lists here between runs (None = parse every run)
+SHORTEST_PATHS = False  # Route through intermediate nodes of sparse graphs (see vrp_utils.shortest_path_closure)
 
 REPETETIONS = 10
 
@@ -34,197 +54,675 @@ def set_default_values():
     global GENERATIONS
     global MUTATION_RATE
     global TOURNAMENT_SIZE
+    global CROSSOVER_OPERATOR
+    global SPLIT_ROUTES
+    global LOCAL_SEARCH_RATE
+    global LOCAL_SEARCH_TIME
+    global NEIGHBORS_K
+    global ISLANDS
+    global MIGRATION_INTERVAL
+    global MIGRANTS
+    global MIGRATION_TOPOLOGY
+    global EVALUATION_WORKERS
+    global EVALUATION_MIN_NODES
+    global FITNESS_CACHE_SIZE
+    global ELITE_SIZE
+    global STEADY_STATE
+    global STEADY_STATE_CHILDREN
+    global TIME_LIMIT
+    global TARGET_COST
+    global STAGNATION_GENERATIONS
+    global SEED_FRACTION
+    global SEED_HEURISTICS
 
     POPULATION_SIZE = 100
     GENERATIONS = 500
     MUTATION_RATE = 0.2
     TOURNAMENT_SIZE = 15
+    CROSSOVER_OPERATOR = "ox"  # One of vrp_crossover.CROSSOVER_OPERATORS
+    SPLIT_ROUTES = True  # Decode each giant tour with the optimal Split instead of fixed route lengths
+    LOCAL_SEARCH_RATE = 0.0  # Probability of improving an individual with local search (memetic mode)
+    LOCAL_SEARCH_TIME = None  # Local search time budget per generation in seconds (None = unlimited)
+    NEIGHBORS_K = None  # Restrict mutation and local search moves to the k nearest neighbors (None = all pairs)
+    ISLANDS = 1  # Number of populations evolved in separate processes (1 = a single population in this process)
+    MIGRATION_INTERVAL = 50  # Generations between migrations
+    MIGRANTS = 2  # Number of best individuals sent by every island to each of its neighbors
+    MIGRATION_TOPOLOGY = "ring"  # "ring" (to the next island) or "all" (to every other island)
+    EVALUATION_WORKERS = None  # Evaluate the population in a pool of worker processes (None = in this process)
+    EVALUATION_MIN_NODES = 200  # Smaller graphs are always evaluated in this process
+    FITNESS_CACHE_SIZE = None  # Remember the costs of this many solutions and routes (None = no cache)
+    ELITE_SIZE = 1  # Number of best individuals copied unchanged into the next generation
+    STEADY_STATE = False  # Replace a few individuals per step instead of the whole population per generation
+    STEADY_STATE_CHILDREN = 10  # Number of children produced (and evaluated together) per steady-state step
+    TIME_LIMIT = None  # Stop after this many seconds (None = unlimited)
+    TARGET_COST = None  # Stop once a solution at least this good is found (None = never)
+    STAGNATION_GENERATIONS = None  # Stop after this many generations without improvement (None = never)
+    SEED_FRACTION = 0.0  # Fraction of the initial population built by construction heuristics
+    SEED_HEURISTICS = ["nearest_neighbor", "cheapest_insertion", "savings"]  # Keys of vrp_construction.CONSTRUCTION_HEURISTICS
+
+
+# Parameters passed to the island processes, which do not share this module's globals
+GA_PARAMETERS = (
+    "POPULATION_SIZE",
+    "GENERATIONS",
+    "MUTATION_RATE",
+    "TOURNAMENT_SIZE",
+    "CROSSOVER_OPERATOR",
+    "SPLIT_ROUTES",
+    "LOCAL_SEARCH_RATE",
+    "LOCAL_SEARCH_TIME",
+    "NEIGHBORS_K",
+    "ISLANDS",
+    "MIGRATION_INTERVAL",
+    "MIGRANTS",
+    "MIGRATION_TOPOLOGY",
+    "EVALUATION_WORKERS",
+    "EVALUATION_MIN_NODES",
+    "FITNESS_CACHE_SIZE",
+    "ELITE_SIZE",
+    "STEADY_STATE",
+    "STEADY_STATE_CHILDREN",
+    "TIME_LIMIT",
+    "TARGET_COST",
+    "STAGNATION_GENERATIONS",
+    "SEED_FRACTION",
+    "SEED_HEURISTICS",
+)
 
 
-def create_initial_population(graph: nx.Graph, vehicles_amount: int) -> list:
+def create_initial_population(distances: DistanceMatrix, vehicles_amount: int) -> Population:
     """
     Create the initial population for the genetic algorithm.
 
     This function generates a list of initial routes for the population by randomly shuffling the nodes
-    and dividing them among the available vehicles.
+    and dividing them among the available vehicles. A SEED_FRACTION of the individuals is built
+    by the SEED_HEURISTICS construction heuristics in turn instead (randomized, so that the
+    seeds differ).
 
     Args:
-        graph (nx.Graph): The graph representing the VRP problem.
+        distances (DistanceMatrix): The distance matrix representing the VRP problem.
         vehicles_amount (int): The number of vehicles available.
 
     Returns:
-        list: A list of initial routes for the population.
+        Population: The initial population.
     """
-    nodes = list(graph.nodes)
-    nodes.remove("A")  # Remove the depot node
-    population = []
-    for _ in range(POPULATION_SIZE):
+    nodes = distances.customers()  # All nodes except the depot
+    population = Population(POPULATION_SIZE, len(nodes), vehicles_amount)
+    seeded = round(SEED_FRACTION * len(population)) if SEED_HEURISTICS else 0
+    for i, chromosome in enumerate(population):
+        if i < seeded:
+            routes = CONSTRUCTION_HEURISTICS[SEED_HEURISTICS[i % len(SEED_HEURISTICS)]](distances, vehicles_amount)
+            chromosome.set_routes(routes + [[] for _ in range(vehicles_amount - len(routes))])
+            continue
         random.shuffle(nodes)  # Shuffle the nodes randomly
-        routes = [nodes[i::vehicles_amount] for i in range(vehicles_amount)]
-        population.append(routes)  # Create routes for each vehicle
+        chromosome.set_routes([nodes[i::vehicles_amount] for i in range(vehicles_amount)])
     return population
 
 
-def evaluate_population(graph: nx.Graph, population: list) -> list:
+def evaluate_population(
+    distances: DistanceMatrix,
+    population: Population,
+    pool: EvaluationPool = None,
+    cache: FitnessCache = None,
+) -> np.ndarray:
     """
     Evaluate the fitness of each individual in the population.
 
-    This function calculates the total cost of each individual's routes and sorts the population
-    based on the fitness scores (total cost).
+    This function calculates the total cost of every individual's routes in one vectorized
+    pass over the distance matrix and stores them in the population. With SPLIT_ROUTES, each
+    giant tour is first split optimally into routes, and the chromosome's route bounds are
+    overwritten with the result. Given an evaluation pool, the population is evaluated in
+    chunks by its worker processes instead. Given a fitness cache, only the individuals missing
+    from it are evaluated, and without SPLIT_ROUTES their routes are looked up one by one.
 
     Args:
-        graph (nx.Graph): The graph representing the VRP problem.
-        population (list): The population to evaluate.
+        distances (DistanceMatrix): The distance matrix representing the VRP problem.
+        population (Population): The population to evaluate.
+        pool (EvaluationPool, optional): The worker processes to evaluate the population in.
+        cache (FitnessCache, optional): The cache of solution and route costs.
 
     Returns:
-        list: A sorted list of tuples containing routes and their corresponding costs.
+        np.ndarray: The total cost of each individual.
+    """
+    if cache is not None:
+        if pool is not None:
+            evaluator = lambda tours, bounds: pool.evaluate(tours, bounds, SPLIT_ROUTES)
+        elif SPLIT_ROUTES:
+            evaluator = lambda tours, bounds: optimal_split(distances, tours, bounds.shape[1], use_all_vehicles=True)
+        else:
+            evaluator = lambda tours, bounds: (cache.tours_cost(distances, tours, bounds), bounds)
+        population.costs[:], population.bounds[:] = cache.evaluate(
+            population.tours, population.bounds, evaluator, SPLIT_ROUTES
+        )
+    elif pool is not None:
+        population.costs[:], population.bounds[:] = pool.evaluate(
+            population.tours, population.bounds, SPLIT_ROUTES
+        )
+    elif SPLIT_ROUTES:
+        population.costs[:], population.bounds[:] = optimal_split(
+            distances, population.tours, population.bounds.shape[1], use_all_vehicles=True
+        )
+    else:
+        population.costs[:] = calculate_tours_cost(distances, population.tours, population.bounds)
+    return population.costs
+
+
+def improve_population(distances: DistanceMatrix, population: Population, neighbors: np.ndarray = None):
     """
-    fitness_scores = []
-    for routes in population:
-        cost = sum(calculate_route_cost(graph, route) for route in routes)
-        fitness_scores.append((routes, cost))  # Append the routes and their total cost
-    return sorted(fitness_scores, key=lambda x: x[1])  # Sort by cost
+    Improve evaluated individuals with local search (memetic mode).
 
+    The best individual and every other one with probability LOCAL_SEARCH_RATE are improved
+    with 2-opt, Or-opt, relocate and exchange moves, until the LOCAL_SEARCH_TIME budget of the
+    generation is spent. Their routes and costs are updated in place.
 
-def tournament_selection(population: list) -> list:
+    Args:
+        distances (DistanceMatrix): The distance matrix representing the VRP problem.
+        population (Population): The evaluated population.
+        neighbors (np.ndarray, optional): Nearest-neighbor lists restricting the moves.
+    """
+    if LOCAL_SEARCH_RATE <= 0:
+        return
+    deadline = time.time() + LOCAL_SEARCH_TIME if LOCAL_SEARCH_TIME is not None else None
+
+    best = int(np.argmin(population.costs))
+    selected = [best] + [
+        i for i in range(len(population)) if i != best and random.random() < LOCAL_SEARCH_RATE
+    ]
+    for i in selected:
+        if deadline is not None and time.time() > deadline:
+            break
+        chromosome = population[i]
+        routes = [route.tolist() for route in chromosome.routes()]
+        local_search(distances, routes, deadline, neighbors)
+        chromosome.set_routes(routes)
+        population.costs[i] = calculate_tours_cost(distances, chromosome.tour, chromosome.bounds)[0]
+
+
+def tournament_selection(costs: np.ndarray) -> int:
     """
     Select an individual using tournament selection.
 
-    This function selects a subset of the population randomly and returns the individual with the best fitness.
+    This function samples TOURNAMENT_SIZE random indices of the population (with replacement)
+    and returns the one with the best fitness, without building any intermediate list.
 
     Args:
-        population (list): The population from which to select.
+        costs (np.ndarray): The costs of the population from which to select.
 
     Returns:
-        list: The selected individual.
+        int: The index of the selected individual.
     """
-    if len(population) < TOURNAMENT_SIZE:
-        raise ValueError("Population size is smaller than tournament size")
+    if len(costs) == 0:
+        raise ValueError("Population is empty")
 
-    selected = random.sample(population, TOURNAMENT_SIZE)  # Randomly select individuals
-    best_individual = min(selected, key=lambda x: x[1])[
-        0
-    ]  # Return the individual with the best fitness
-    # print(f"best_individual{best_individual}")
-    if not best_individual:
-        raise ValueError("Selected individual is empty")
+    size = len(costs)
+    best = random.randrange(size)
+    for _ in range(TOURNAMENT_SIZE - 1):
+        i = random.randrange(size)
+        if costs[i] < costs[best]:  # Keep the individual with the best fitness
+            best = i
+    return best
 
-    return best_individual
 
-
-def crossover(parent1: list, parent2: list) -> tuple:
+def crossover(parent1: Chromosome, parent2: Chromosome, child1: Chromosome, child2: Chromosome = None):
     """
     Perform crossover between two parents to produce two children.
 
-    This function combines routes from two parents to create two new child routes.
+    This function combines the giant tours of two parents and writes the two new child tours
+    in place, using the operator selected by CROSSOVER_OPERATOR. The children inherit the
+    route lengths of the first parent.
+
+    Args:
+        parent1 (Chromosome): The first parent.
+        parent2 (Chromosome): The second parent.
+        child1 (Chromosome): The chromosome overwritten with the first child.
+        child2 (Chromosome, optional): The chromosome overwritten with the second child.
+    """
+    operator = CROSSOVER_OPERATORS[CROSSOVER_OPERATOR]
+    operator(parent1.tour, parent2.tour, out=child1.tour)
+    child1.bounds[:] = parent1.bounds
+    if child2 is not None:
+        operator(parent2.tour, parent1.tour, out=child2.tour)
+        child2.bounds[:] = parent1.bounds
+
+
+def mutate(chromosome: Chromosome, neighbors: np.ndarray = None, positions: np.ndarray = None) -> Chromosome:
+    """
+    Mutate a given chromosome with a certain mutation rate.
+
+    This function randomly swaps two nodes of the giant tour in place to introduce variation.
+    Given nearest-neighbor lists, the swap instead moves a random neighbor of a random node
+    right behind it.
 
     Args:
-        parent1 (list): The first parent.
-        parent2 (list): The second parent.
+        chromosome (Chromosome): The chromosome to mutate.
+        neighbors (np.ndarray, optional): The nearest neighbors of every node.
+        positions (np.ndarray, optional): The position of every node in the tour, as a row of
+            Population.positions(), so that the neighbor is found in O(1) instead of by a scan
+            of the tour. Kept up to date by the swap.
 
     Returns:
-        tuple: Two children produced from the crossover.
+        Chromosome: The mutated chromosome.
     """
-    child1 = []
-    child2 = []
+    if random.random() < MUTATION_RATE:
+        size = len(chromosome.tour)
+        if size > 2:  # Ensure there are enough nodes to swap
+            if neighbors is not None and neighbors.shape[1]:
+                i = random.randint(0, size - 2)
+                neighbor = random.choice(neighbors[chromosome.tour[i]])
+                if positions is not None:
+                    j = int(positions[neighbor])
+                else:
+                    j = int(np.flatnonzero(chromosome.tour == neighbor)[0])
+                chromosome.swap(i + 1, j)  # Place the neighbor right after the node
+                if positions is not None:
+                    positions[chromosome.tour[i + 1]], positions[chromosome.tour[j]] = i + 1, j
+            else:
+                i = random.randint(0, size - 1)
+                j = random.randint(0, size - 1)
+                chromosome.swap(i, j)  # Swap two nodes
+    return chromosome
+
 
-    vehicles_routes_lengths, parent1_routes = couple_routes(parent1)
-    vehicles_routes_lengths2, parent2_routes = couple_routes(parent2)
+def record_incumbent(stop: StopCondition, population: Population, generations: float = 1) -> bool:
+    """
+    Record the best individual of an evaluated population in the stopping criteria.
 
-    # print(f"p1{parent1_routes}")
-    # print(f"p2{parent2}")
+    Args:
+        stop (StopCondition): The stopping criteria, keeping a copy of the best individual.
+        population (Population): The evaluated population.
+        generations (float): The number of generations since the last record.
 
-    crossover_point = random.randint(1, len(parent1_routes) - 1)
+    Returns:
+        bool: Whether the run should stop.
+    """
+    best = int(np.argmin(population.costs))
+    # Without any feasible individual the first one is still kept, to be returned at infinite cost
+    if stop.record(population.costs[best], generations) or stop.incumbent is None:
+        stop.incumbent = population[best].copy()
+    return stop.should_stop()
+
+
+def evolve(
+    distances: DistanceMatrix,
+    population: Population,
+    offspring: Population,
+    generations: int,
+    neighbors: np.ndarray = None,
+    pool: EvaluationPool = None,
+    cache: FitnessCache = None,
+    stop: StopCondition = None,
+) -> tuple:
+    """
+    Evolve a population for a number of generations.
 
-    # CROSSOVER
-    child_route1 = order_crossover(parent1_routes, parent2_routes)
-    child_route2 = order_crossover(parent2_routes, parent1_routes)
+    Every generation the population is evaluated and improved, and the offspring buffer is
+    overwritten with the ELITE_SIZE best individuals and children produced by selection,
+    crossover and mutation. The buffers are then swapped, so the returned population is not
+    evaluated yet. With STEADY_STATE the population is evolved in place by steady_state().
+    Given stopping criteria, the best individual is recorded every generation and the
+    evolution ends early once they are met.
 
-    child1 = decouple_routes(vehicles_routes_lengths, child_route1)
-    child2 = decouple_routes(vehicles_routes_lengths, child_route2)
+    Args:
+        distances (DistanceMatrix): The distance matrix representing the VRP problem.
+        population (Population): The current population.
+        offspring (Population): The buffer for the next generation.
+        generations (int): The number of generations.
+        neighbors (np.ndarray, optional): Nearest-neighbor lists restricting the moves.
+        pool (EvaluationPool, optional): The worker processes to evaluate the population in.
+        cache (FitnessCache, optional): The cache of solution and route costs.
+        stop (StopCondition, optional): The stopping criteria.
 
-    return child1, child2
+    Returns:
+        tuple: The new population and the spare buffer.
+    """
+    if STEADY_STATE:
+        steps = generations * len(population) // STEADY_STATE_CHILDREN
+        return steady_state(distances, population, steps, neighbors, pool, cache, stop), offspring
+
+    elite_size = min(ELITE_SIZE, len(population))
+    for _ in range(generations):
+        costs = evaluate_population(distances, population, pool, cache)
+        improve_population(distances, population, neighbors)
+        if stop is not None and record_incumbent(stop, population):
+            break
+        # Select the elite in linear time, without sorting the population
+        elite = np.argpartition(costs, elite_size - 1)[:elite_size] if elite_size else []
+        offspring.tours[:elite_size] = population.tours[elite]
+        offspring.bounds[:elite_size] = population.bounds[elite]
+        for i in range(elite_size, len(offspring), 2):
+            parent1 = population[tournament_selection(costs)]
+            parent2 = population[tournament_selection(costs)]
+            child1 = offspring[i]
+            child2 = offspring[i + 1] if i + 1 < len(offspring) else None
+            crossover(parent1, parent2, child1, child2)
+        # The neighbor mutation looks nodes up in the inverse tours of all children at once
+        positions = offspring.positions() if neighbors is not None else None
+        for i in range(elite_size, len(offspring)):
+            mutate(offspring[i], neighbors, positions[i] if positions is not None else None)
+        population, offspring = offspring, population
+    return population, offspring
+
+
+def steady_state(
+    distances: DistanceMatrix,
+    population: Population,
+    steps: int,
+    neighbors: np.ndarray = None,
+    pool: EvaluationPool = None,
+    cache: FitnessCache = None,
+    stop: StopCondition = None,
+) -> Population:
+    """
+    Evolve a population in place, replacing only a few individuals per step.
 
+    Every step STEADY_STATE_CHILDREN children are bred, evaluated and improved, and each of
+    them replaces the worst individual if it is better. The individuals are kept in a max-heap
+    of costs, so the worst one is found in O(1) and replaced in O(log P), and the best ones
+    (in particular the ELITE_SIZE best) are never lost.
 
-def order_crossover(p1, p2):
+    Args:
+        distances (DistanceMatrix): The distance matrix representing the VRP problem.
+        population (Population): The population, evolved in place.
+        steps (int): The number of steps.
+        neighbors (np.ndarray, optional): Nearest-neighbor lists restricting the moves.
+        pool (EvaluationPool, optional): The worker processes to evaluate the population in.
+        cache (FitnessCache, optional): The cache of solution and route costs.
+        stop (StopCondition, optional): The stopping criteria, checked after every step.
+
+    Returns:
+        Population: The evaluated population.
+    """
+    costs = evaluate_population(distances, population, pool, cache)
+    improve_population(distances, population, neighbors)
+    if stop is not None and record_incumbent(stop, population, 0):
+        return population
+    children = Population(STEADY_STATE_CHILDREN, population.tours.shape[1], population.bounds.shape[1])
+    # Max-heap of (cost, index) entries, with the worst individual at the top
+    worst = [(-cost, i) for i, cost in enumerate(costs.tolist())]
+    heapq.heapify(worst)
+
+    for _ in range(steps):
+        for i in range(0, len(children), 2):
+            parent1 = population[tournament_selection(costs)]
+            parent2 = population[tournament_selection(costs)]
+            child2 = children[i + 1] if i + 1 < len(children) else None
+            crossover(parent1, parent2, children[i], child2)
+        positions = children.positions() if neighbors is not None else None
+        for i in range(len(children)):
+            mutate(children[i], neighbors, positions[i] if positions is not None else None)
+        evaluate_population(distances, children, pool, cache)
+        improve_population(distances, children, neighbors)
+
+        for child, cost in zip(children, children.costs.tolist()):
+            worst_cost, i = worst[0]
+            if cost < -worst_cost:
+                population[i].copy_from(child)
+                costs[i] = cost
+                heapq.heapreplace(worst, (-cost, i))
+        # A step replaces a fraction of a generation
+        if stop is not None and record_incumbent(stop, children, len(children) / len(population)):
+            break
+    return population
+
+
+def migration_targets(island: int) -> list:
+    """
+    Return the islands receiving the migrants of an island in MIGRATION_TOPOLOGY.
     """
-    Perform order crossover between two parents to produce a child.
+    if MIGRATION_TOPOLOGY == "ring":
+        return [(island + 1) % ISLANDS]
+    if MIGRATION_TOPOLOGY == "all":
+        return [i for i in range(ISLANDS) if i != island]
+    raise ValueError(f"Unknown migration topology: {MIGRATION_TOPOLOGY}")
 
-    This function combines routes from two parents to create a new child route.
 
+class IslandStopCondition(StopCondition):
     """
-    size = len(p1)
-    child = [None] * size
+    Stopping criteria of an island, which also stops once the parent sets the stop event.
 
-    # Choose two random points for the crossover
-    start, end = sorted(random.sample(range(size), 2))
+    The patience is left to the vote at every migration, so that a stagnating island keeps
+    evolving (and may be revived by migrants) until all islands stagnate.
+    """
 
-    # Copy the segment from the first parent to the child
-    child[start:end] = p1[start:end]
+    __slots__ = ("stop_event",)
 
-    # Fill the remaining positions with nodes from the second parent
-    p2_index = 0
-    for i in range(size):
-        if child[i] is None:
-            while p2[p2_index] in child:
-                p2_index += 1
-            child[i] = p2[p2_index]
+    def __init__(self, stop_event, time_limit: float = None, target_cost: float = None):
+        super().__init__(time_limit, target_cost)
+        self.stop_event = stop_event
 
-    return child
+    def should_stop(self) -> bool:
+        return super().should_stop() or self.stop_event.is_set()
 
 
-def mutate(chromosome: list) -> list:
+def run_island(
+    island: int,
+    distances: DistanceMatrix,
+    vehicles_amount: int,
+    parameters: dict,
+    seed: int,
+    inboxes: list,
+    results: multiprocessing.Queue,
+    control: tuple,
+    neighbors: np.ndarray = None,
+):
     """
-    Mutate a given chromosome with a certain mutation rate.
+    Evolve one island of the island model in a worker process.
 
-    This function randomly swaps two nodes in the chromosome to introduce variation.
+    Every MIGRATION_INTERVAL generations the island sends copies of its MIGRANTS best
+    individuals to its neighbors, waits for theirs and lets them replace its worst individuals.
+    The islands then agree whether to stop: as soon as one of them reaches the time limit or
+    the target cost, or the parent asks them to, or once all of them stagnate. A stagnating
+    island keeps evolving until then. The best individual found is finally put on the results
+    queue.
 
     Args:
-        chromosome (list): The chromosome to mutate.
-
-    Returns:
-        list: The mutated chromosome.
+        island (int): The index of the island.
+        distances (DistanceMatrix): The distance matrix representing the VRP problem.
+        vehicles_amount (int): The number of vehicles available.
+        parameters (dict): The GA_PARAMETERS values of the parent process.
+        seed (int): The random seed of the island.
+        inboxes (list): The migrant queue of every island.
+        results (multiprocessing.Queue): The queue receiving (cost, tour, bounds, cache counters).
+        control (tuple): The stop event set by the parent, the stop votes of the islands and
+            the barrier synchronizing the votes.
+        neighbors (np.ndarray, optional): Precomputed nearest-neighbor lists (computed from
+            NEIGHBORS_K if None).
     """
-    vehicles_routes_lengths, coupled_routes = couple_routes(chromosome)
-    if random.random() < MUTATION_RATE:
-        if len(coupled_routes) > 2:  # Ensure there are enough nodes to swap
-            i = random.randint(0, len(coupled_routes) - 1)
-            j = random.randint(0, len(coupled_routes) - 1)
-            coupled_routes[i], coupled_routes[j] = (
-                coupled_routes[j],
-                coupled_routes[i],
-            )  # Swap two nodes
-    chromosome = decouple_routes(vehicles_routes_lengths, coupled_routes)
-    return chromosome
+    # Interrupts are handled by the parent, which asks the islands to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    globals().update(parameters)
+    random.seed(seed)
+    stop_event, votes, barrier = control
+    stop = IslandStopCondition(stop_event, TIME_LIMIT, TARGET_COST)
+    if neighbors is None and NEIGHBORS_K:
+        neighbors = nearest_neighbors(distances, NEIGHBORS_K)
+    targets = migration_targets(island)
+    senders = sum(island in migration_targets(i) for i in range(ISLANDS))
+    cache = FitnessCache(FITNESS_CACHE_SIZE) if FITNESS_CACHE_SIZE else None
+
+    population = create_initial_population(distances, vehicles_amount)
+    offspring = Population(len(population), population.tours.shape[1], vehicles_amount)
+    remaining = GENERATIONS
+    while True:
+        generations = min(MIGRATION_INTERVAL, remaining)
+        population, offspring = evolve(
+            distances, population, offspring, generations, neighbors, cache=cache, stop=stop
+        )
+        # The whole interval counts even when evolve() returns early, so that all the islands
+        # leave the loop in the same round; an early return means this island votes to stop
+        remaining -= generations
+        costs = evaluate_population(distances, population, cache=cache)
+        if remaining <= 0:
+            break
+
+        # 2 = stop now, 1 = stagnating, 0 = continue
+        stagnating = STAGNATION_GENERATIONS is not None and stop.stale >= STAGNATION_GENERATIONS
+        votes[island] = 2 if stop.should_stop() else int(stagnating)
+        barrier.wait()
+        decision = max(votes[:]) == 2 or min(votes[:]) == 1
+        barrier.wait()  # Nobody votes again before everybody has read the votes
+        if decision:
+            break
+
+        ranking = np.argsort(costs)
+        best = ranking[:MIGRANTS]
+        for target in targets:
+            inboxes[target].put((population.tours[best].copy(), population.bounds[best].copy()))
+        migrants = [inboxes[island].get() for _ in range(senders)]
+        tours = np.concatenate([tours for tours, _ in migrants])[: len(population)]
+        bounds = np.concatenate([bounds for _, bounds in migrants])[: len(population)]
+        worst = ranking[len(ranking) - len(tours) :]
+        population.tours[worst] = tours
+        population.bounds[worst] = bounds
+
+    improve_population(distances, population, neighbors)
+    record_incumbent(stop, population)
+    counters = cache.stats() if cache is not None else {}
+    results.put((float(stop.best_cost), stop.incumbent.tour, stop.incumbent.bounds, counters))
+
+
+def island_model(
+    distances: DistanceMatrix,
+    vehicles_amount: int,
+    cache: FitnessCache = None,
+    stop: StopCondition = None,
+    neighbors: np.ndarray = None,
+) -> tuple:
+    """
+    Evolve ISLANDS populations in separate processes and collect the best individual.
+
+    Every island keeps its own fitness cache, whose counters are added to the given one. An
+    interrupt asks the islands to stop at their next migration and still collects their results.
+    If an island crashes, the others are terminated and a RuntimeError is raised.
 
+    Args:
+        distances (DistanceMatrix): The distance matrix representing the VRP problem.
+        vehicles_amount (int): The number of vehicles available.
+        cache (FitnessCache, optional): The cache collecting the counters of the islands.
+        stop (StopCondition, optional): Marked as interrupted if the run was interrupted.
+        neighbors (np.ndarray, optional): Precomputed nearest-neighbor lists for the islands.
 
-def genetic_algorithm(graph: nx.Graph, vehicles_amount: int) -> tuple:
+    Returns:
+        tuple: The best chromosome across the islands and its cost.
+    """
+    # Fail here on an invalid topology rather than in every island
+    for i in range(ISLANDS):
+        migration_targets(i)
+    parameters = {name: globals()[name] for name in GA_PARAMETERS}
+    inboxes = [multiprocessing.Queue() for _ in range(ISLANDS)]
+    results = multiprocessing.Queue()
+    stop_event = multiprocessing.Event()
+    control = (stop_event, multiprocessing.Array("b", ISLANDS), multiprocessing.Barrier(ISLANDS))
+    islands = [
+        multiprocessing.Process(
+            target=run_island,
+            args=(
+                i, distances, vehicles_amount, parameters, random.randrange(2**32), inboxes, results, control, neighbors
+            ),
+        )
+        for i in range(ISLANDS)
+    ]
+    for process in islands:
+        process.start()
+    # Collect the results before joining, so that no process blocks on a full queue
+    collected = []
+    while len(collected) < len(islands):
+        try:
+            collected.append(results.get(timeout=1))
+        except queue.Empty:
+            # The other islands would wait forever for the votes and migrants of a crashed one
+            failed = [
+                (i, process.exitcode) for i, process in enumerate(islands) if process.exitcode not in (None, 0)
+            ]
+            if failed:
+                control[2].abort()
+                for process in islands:
+                    process.terminate()
+                    process.join()
+                raise RuntimeError(f"Island {failed[0][0]} exited with code {failed[0][1]}")
+        except KeyboardInterrupt:
+            stop_event.set()
+            if stop is not None:
+                stop.interrupted = True
+    for process in islands:
+        process.join()
+    best_cost, tour, bounds, _ = min(collected, key=lambda result: result[0])
+    if cache is not None:
+        for *_, counters in collected:
+            cache.hits += counters.get("cache_hits", 0)
+            cache.misses += counters.get("cache_misses", 0)
+            cache.route_hits += counters.get("route_cache_hits", 0)
+            cache.route_misses += counters.get("route_cache_misses", 0)
+    return Chromosome(tour, bounds), best_cost
+
+
+def genetic_algorithm(
+    graph: nx.Graph,
+    vehicles_amount: int,
+    cache: FitnessCache = None,
+    stop: StopCondition = None,
+    neighbors: np.ndarray = None,
+) -> tuple:
     """
     Solve the VRP problem using a genetic algorithm.
 
     This function initializes the population, evaluates it, and iteratively performs selection,
-    crossover, and mutation to evolve the population towards better solutions.
+    crossover, and mutation to evolve the population towards better solutions. With ISLANDS
+    greater than 1, several populations evolve in parallel with periodic migration. With
+    EVALUATION_WORKERS set, graphs of at least EVALUATION_MIN_NODES nodes are evaluated in a
+    shared-memory pool of worker processes.
+
+    The run ends after GENERATIONS generations, or earlier once TIME_LIMIT, TARGET_COST or
+    STAGNATION_GENERATIONS is reached. An interrupt (Ctrl+C) ends it too, and the best solution
+    found so far is returned.
 
     Args:
-        graph (nx.Graph): The graph representing the VRP problem.
+        graph (nx.Graph | DistanceMatrix): The graph representing the VRP problem.
         vehicles_amount (int): The number of vehicles available.
+        cache (FitnessCache, optional): The cache of solution and route costs, whose hit and
+            miss counters are updated by the run.
+        stop (StopCondition, optional): The stopping criteria, instead of the ones given by
+            TIME_LIMIT, TARGET_COST and STAGNATION_GENERATIONS.
+        neighbors (np.ndarray, optional): Precomputed nearest-neighbor lists, e.g. from an
+            InstanceCache (computed from NEIGHBORS_K if None).
 
     Returns:
-        tuple: The best routes and their total cost.
+        tuple: The best routes (node labels) and their total cost.
     """
-    population = create_initial_population(graph, vehicles_amount)
-    for _ in range(GENERATIONS):
-        population = evaluate_population(graph, population)
-        new_population = []
-        for _ in range(POPULATION_SIZE // 2):
-            parent1 = tournament_selection(population)
-            parent2 = tournament_selection(population)
-            child1, child2 = crossover(parent1, parent2)
-            new_population.append(mutate(child1))
-            new_population.append(mutate(child2))
-        population = new_population
-    best_routes, best_cost = evaluate_population(graph, population)[0]
-    return best_routes, best_cost
+    distances = as_distance_matrix(graph)
+    if stop is None:
+        stop = StopCondition(TIME_LIMIT, TARGET_COST, STAGNATION_GENERATIONS)
+    if ISLANDS > 1:
+        best, best_cost = island_model(distances, vehicles_amount, cache, stop, neighbors)
+        if stop.record(best_cost) or stop.incumbent is None:
+            stop.incumbent = best
+    else:
+        if neighbors is None and NEIGHBORS_K:
+            neighbors = nearest_neighbors(distances, NEIGHBORS_K)
+        pool = None
+        if EVALUATION_WORKERS and distances.number_of_nodes() >= EVALUATION_MIN_NODES:
+            pool = EvaluationPool(distances, EVALUATION_WORKERS)
+        try:
+            population = create_initial_population(distances, vehicles_amount)
+            # The offspring are written into a second buffer, swapped with the population every generation
+            offspring = Population(len(population), population.tours.shape[1], vehicles_amount)
+            population, offspring = evolve(
+                distances, population, offspring, GENERATIONS, neighbors, pool, cache, stop
+            )
+            evaluate_population(distances, population, pool, cache)
+            improve_population(distances, population, neighbors)
+            record_incumbent(stop, population)
+        except KeyboardInterrupt:
+            # Return the best solution found so far
+            if stop.incumbent is None:
+                raise
+            stop.interrupted = True
+        finally:
+            if pool is not None:
+                pool.close()
+        best = stop.incumbent
+    best_cost = int(stop.best_cost) if np.isfinite(stop.best_cost) else sys.maxsize
+    return best.to_labels(distances), best_cost
 
 
 def main():
@@ -234,31 +732,52 @@ def main():
     results = []
     # Initialize the JSON file
     save_results_to_json(results, OUTPUT_FILENAME)
+    instances = InstanceCache(INSTANCE_CACHE_DIR) if INSTANCE_CACHE_DIR else None
 
     for f in sorted(os.listdir(INPUT_DIR)):
         graph_filename = os.path.join(INPUT_DIR, f)
         print(f"Processing {graph_filename}")
-        # Load the graph
-        graph = load_graph(graph_filename)
+        # Load the graph, with its neighbor lists and lower bound
+        if instances is not None:
+            if SHORTEST_PATHS:
+                graph = instances.shortest_paths(graph_filename)
+            else:
+                graph = instances.distance_matrix(graph_filename)
+            neighbors = (
+                instances.nearest_neighbors(graph_filename, NEIGHBORS_K, SHORTEST_PATHS) if NEIGHBORS_K else None
+            )
+            lower_bound = instances.lower_bounds(graph_filename, SHORTEST_PATHS).sum()
+        else:
+            graph = load_distance_matrix(graph_filename)
+            if SHORTEST_PATHS:
+                graph = shortest_path_closure(graph)
+            neighbors = None
+            lower_bound = customer_lower_bounds(graph).sum()
 
         vehicles_results = []
         for vehicles_amount in VEHICLES_AMOUNTS:
             best_cost_sum = 0
             execution_time_sum = 0
+            cache_stats = {}
             for _ in range(0, REPETETIONS):
+                cache = FitnessCache(FITNESS_CACHE_SIZE) if FITNESS_CACHE_SIZE else None
                 start_time = time.time()
                 # Solve VRP using genetic algorithm
-                best_routes, best_cost = genetic_algorithm(graph, vehicles_amount)
+                best_routes, best_cost = genetic_algorithm(graph, vehicles_amount, cache, neighbors=neighbors)
                 end_time = time.time()
+                if cache is not None:
+                    for name, count in cache.stats().items():
+                        cache_stats[name] = cache_stats.get(name, 0) + count
 
                 best_cost_sum += best_cost
                 execution_time_sum += end_time - start_time
 
             best_cost = best_cost_sum / REPETETIONS
             execution_time = execution_time_sum / REPETETIONS
+            best_routes = graph.expand_routes(get_routes(best_routes))
 
             # Print the best routes, their cost, and execution time
-            print(f"Best routes: {get_routes(best_routes)}")
+            print(f"Best routes: {best_routes}")
             print(f"Total cost: {best_cost}")
             print(f"Vehicles amount: {vehicles_amount}")
             print(f"Execution time: {execution_time} seconds\n")
@@ -267,8 +786,9 @@ def main():
                 {
                     "vehicles_amount": vehicles_amount,
                     "execution_time": execution_time,
-                    "best_routes": get_routes(best_routes),
+                    "best_routes": best_routes,
                     "total_cost": best_cost,
+                    **cache_stats,
                 }
             )
 
@@ -278,6 +798,7 @@ def main():
                     "name": graph_filename,
                     "nodes_count": graph.number_of_nodes(),
                     "edges_count": graph.number_of_edges(),
+                    "lower_bound": float(lower_bound),
                     "vehicles_amounts": vehicles_results,
                 }
             )
@@ -347,5 +868,6 @@ if __name__ == "__main__":
     GENERATIONS = 10000
     MUTATION_RATE = 0.5
     TOURNAMENT_SIZE = 15
+    STAGNATION_GENERATIONS = 1000
     OUTPUT_FILENAME = f"results/{INPUT_GRAPHS}_GA_p{POPULATION_SIZE}_g{GENERATIONS}_m{str(MUTATION_RATE).replace('.','')}_t{TOURNAMENT_SIZE}.json"
     main()
@@ -0,0 +1,300 @@
+import networkx as nx
+import numpy as np
+import sys
+import os
+import time
+from vrp_utils import (
+    DistanceMatrix,
+    load_distance_matrix,
+    as_distance_matrix,
+    save_results_to_json,
+)
+from vrp_instance_cache import InstanceCache
+
+INPUT_GRAPHS = "5-1000_1"
+INPUT_DIR = f"graphs/{INPUT_GRAPHS}"
+
+OUTPUT_FILENAME = f"results/{INPUT_GRAPHS}_DP.json"
+
+VEHICLES_AMOUNTS = [1, 2, 3, 4]
+SHORTEST_PATHS = False  # Route through intermediate nodes of sparse graphs (see vrp_utils.shortest_path_closure)
+
+# Larger instances are skipped by main(), the tables grow with 2^(nodes - 1)
+MAX_NODES = 20
+
+# Number of low mask bits handled by one vectorized step of the subset convolution
+BLOCK_BITS = 10
+
+
+def _popcounts(bits: int) -> np.ndarray:
+    """
+    Count the set bits of every mask of the given width.
+    """
+    counts = np.zeros(1 << bits, dtype=np.int8)
+    for b in range(bits):
+        counts[1 << b : 2 << b] = counts[: 1 << b] + 1
+    return counts
+
+
+def _disjoint_pairs(bits: int) -> tuple:
+    """
+    List every pair of disjoint masks of the given width, sorted by their union.
+
+    Returns:
+    first (numpy.ndarray): The first mask of each pair
+    second (numpy.ndarray): The second mask of each pair
+    starts (numpy.ndarray): The offset of the first pair of every union
+    """
+    # Every bit is either in the first mask, in the second one or in neither
+    digits = np.arange(3**bits)
+    first = np.zeros_like(digits)
+    second = np.zeros_like(digits)
+    for b in range(bits):
+        digit = digits % 3
+        first |= (digit == 1).astype(digits.dtype) << b
+        second |= (digit == 2).astype(digits.dtype) << b
+        digits //= 3
+    union = first | second
+    order = np.argsort(union, kind="stable")
+    starts = np.searchsorted(union[order], np.arange(1 << bits))
+    return first[order], second[order], starts
+
+
+def _submasks(mask: int) -> np.ndarray:
+    """
+    List every submask of a mask.
+    """
+    submasks = np.zeros(1, dtype=np.int64)
+    b = 0
+    while mask >> b:
+        if mask >> b & 1:
+            submasks = np.concatenate((submasks, submasks | 1 << b))
+        b += 1
+    return submasks
+
+
+def held_karp(distances: DistanceMatrix) -> tuple:
+    """
+    Compute the cheapest single route through every subset of customers (Held-Karp).
+
+    Customer id c corresponds to bit c - 1 of a mask. The path table is built one subset size
+    at a time and only the previous size is kept, indexed by the rank of a mask among the masks
+    of its size, so the float32 costs never take more than C(n, n/2) rows. The predecessors are
+    kept as int8 to recover the order of a route later.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+
+    Returns:
+    route_costs (numpy.ndarray): The cost of the best route through each subset (inf if none)
+    tables (tuple): The last customers, predecessors and ranks, see route_order()
+    """
+    n = distances.number_of_nodes() - 1
+    weights = distances.weights.astype(np.float32)
+    counts = _popcounts(n)
+    masks = np.argsort(counts, kind="stable")
+    layer_starts = np.concatenate(([0], np.cumsum(np.bincount(counts, minlength=n + 1))))
+    rank = np.empty(1 << n, dtype=np.int64)
+    rank[masks] = np.arange(1 << n) - layer_starts[counts[masks]]
+
+    route_costs = np.full(1 << n, np.inf, dtype=np.float32)
+    route_costs[0] = 0
+    last = np.zeros(1 << n, dtype=np.int8)
+    predecessors = [np.zeros((1, n), dtype=np.int8)]
+
+    # paths[r, j] is the cheapest path from the depot through the r-th subset ending at j
+    paths = np.full((1, n), np.inf, dtype=np.float32)
+    for size in range(1, n + 1):
+        layer = masks[layer_starts[size] : layer_starts[size + 1]]
+        current = np.full((len(layer), n), np.inf, dtype=np.float32)
+        parents = np.zeros((len(layer), n), dtype=np.int8)
+        for j in range(n):
+            ending = layer[layer >> j & 1 == 1]
+            rows = rank[ending]
+            if size == 1:
+                current[rows, j] = weights[0, j + 1]
+                continue
+            # Customers outside the previous subset have an infinite path cost
+            candidates = paths[rank[ending ^ 1 << j]] + weights[1:, j + 1]
+            best = np.argmin(candidates, axis=1)
+            parents[rows, j] = best
+            current[rows, j] = candidates[np.arange(len(ending)), best]
+
+        closed = current + weights[1:, 0]
+        last[layer] = np.argmin(closed, axis=1)
+        route_costs[layer] = closed[np.arange(len(layer)), last[layer]]
+        predecessors.append(parents)
+        paths = current
+    return route_costs, (last, predecessors, rank)
+
+
+def route_order(mask: int, tables: tuple) -> list:
+    """
+    Recover the order of the best route through a subset of customers.
+
+    Parameters:
+    mask (int): The subset of customers
+    tables (tuple): The tables returned by held_karp()
+
+    Returns:
+    route (list): The customer ids in visiting order (without the depot)
+    """
+    last, predecessors, rank = tables
+    route = []
+    size = bin(mask).count("1")
+    if size == 0:
+        return route
+    j = int(last[mask])
+    while size > 0:
+        route.append(j + 1)
+        previous = int(predecessors[size][rank[mask], j])
+        mask ^= 1 << j
+        size -= 1
+        j = previous
+    return route[::-1]
+
+
+def min_plus_convolution(f: np.ndarray, g: np.ndarray) -> np.ndarray:
+    """
+    Compute h[m] = min(f[s] + g[m \\ s]) over all submasks s of every mask m.
+
+    The masks are split into high and low bits. For every pair of disjoint high parts, all pairs
+    of disjoint low parts are evaluated at once and reduced by their union, so the 3^n terms are
+    processed in 3^(n - BLOCK_BITS) vectorized steps. When f and g are the same table, the high
+    parts (s, t) and (t, s) give the same block, so only half of them are evaluated.
+
+    Parameters:
+    f (numpy.ndarray): The first table, indexed by mask
+    g (numpy.ndarray): The second table, indexed by mask
+
+    Returns:
+    h (numpy.ndarray): The convolution, indexed by mask
+    """
+    bits = len(f).bit_length() - 1
+    low_bits = min(bits, BLOCK_BITS)
+    block = 1 << low_bits
+    first, second, starts = _disjoint_pairs(low_bits)
+    high_first, high_second, _ = _disjoint_pairs(bits - low_bits)
+    if f is g:
+        symmetric = high_first <= high_second
+        high_first, high_second = high_first[symmetric], high_second[symmetric]
+
+    h = np.full_like(f, np.inf)
+    for s, t in zip(high_first.tolist(), high_second.tolist()):
+        terms = f[s * block : (s + 1) * block][first] + g[t * block : (t + 1) * block][second]
+        target = h[(s | t) * block : ((s | t) + 1) * block]
+        np.minimum(target, np.minimum.reduceat(terms, starts), out=target)
+    return h
+
+
+def vrp_held_karp(graph: nx.Graph, vehicles_amount: int, use_all_vehicles: bool = True) -> tuple:
+    """
+    Solve the Vehicle Routing Problem exactly using dynamic programming over customer subsets.
+
+    Held-Karp gives the cheapest route through every subset of customers. The cheapest cover of
+    every subset with k routes is then the min-plus subset convolution of the route costs with
+    the cover with k - 1 routes. Only the covers with up to half of the routes are tabulated;
+    the full set is split once between two such halves.
+
+    Parameters:
+    graph (networkx.Graph | DistanceMatrix): The graph
+    vehicles_amount (int): The number of vehicles
+    use_all_vehicles (bool): Require every vehicle to serve at least one customer, like the
+        brute force does, instead of allowing unused vehicles
+
+    Returns:
+    best_routes (list of lists): The best routes for each vehicle
+    best_cost (int): The total cost of the best routes
+    """
+    distances = as_distance_matrix(graph)
+    n = distances.number_of_nodes() - 1
+    full = (1 << n) - 1
+    # Number of routes to combine
+    levels = min(vehicles_amount, n) if use_all_vehicles else vehicles_amount
+
+    route_costs, tables = held_karp(distances)
+    if levels == 0:
+        best_cost = 0 if n == 0 else np.inf
+        masks = []
+    else:
+        # An empty route is only allowed when vehicles may stay unused
+        routes = route_costs.copy()
+        if use_all_vehicles:
+            routes[0] = np.inf
+
+        # covers[k][m] is the cheapest cover of subset m with k routes
+        half, rest = levels // 2, levels - levels // 2
+        covers = [None, routes]
+        for _ in range(2, rest + 1):
+            covers.append(min_plus_convolution(routes, covers[-1]))
+
+        def decompose(mask: int, k: int) -> list:
+            if k == 1:
+                return [mask]
+            submasks = _submasks(mask)
+            s = int(submasks[np.argmin(routes[submasks] + covers[k - 1][mask ^ submasks])])
+            return [s] + decompose(mask ^ s, k - 1)
+
+        if half == 0:
+            best_cost = covers[rest][full]
+            masks = [full]
+        else:
+            submasks = np.arange(full + 1)
+            totals = covers[half][submasks] + covers[rest][full ^ submasks]
+            s = int(np.argmin(totals))
+            best_cost = totals[s]
+            masks = decompose(s, half) + decompose(full ^ s, rest)
+
+    if not np.isfinite(best_cost):
+        return None, sys.maxsize
+    best_routes = [route_order(mask, tables) for mask in masks]
+    best_routes += [[] for _ in range(vehicles_amount - len(best_routes))]
+    return [distances.to_labels([0] + route + [0]) for route in best_routes], int(best_cost)
+
+
+if __name__ == "__main__":
+    results = []
+
+    # Initialize the JSON file
+    save_results_to_json(results, OUTPUT_FILENAME)
+    instances = InstanceCache() if SHORTEST_PATHS else None
+
+    for f in sorted(os.listdir(INPUT_DIR)):
+        graph_filename = os.path.join(INPUT_DIR, f)
+        # Load the graph (or its shortest path closure, cached between runs)
+        graph = instances.shortest_paths(graph_filename) if instances else load_distance_matrix(graph_filename)
+        if graph.number_of_nodes() > MAX_NODES:
+            continue
+        print(f"Processing {graph_filename}")
+        vehicles_results = []
+        for vehicles_amount in VEHICLES_AMOUNTS:
+            start_time = time.time()
+            # Solve VRP using dynamic programming
+            best_routes, best_cost = vrp_held_karp(graph, vehicles_amount)
+            end_time = time.time()
+            execution_time = end_time - start_time
+            best_routes = graph.expand_routes(best_routes)
+
+            # Print the best routes, their cost, and execution time
+            print(f"Best routes: {best_routes}")
+            print(f"Total cost: {best_cost}")
+            print(f"Vehicles amount: {vehicles_amount}")
+            print(f"Execution time: {execution_time} seconds\n")
+
+            vehicles_results.append({
+                "vehicles_amount": vehicles_amount,
+                "execution_time": execution_time,
+                "best_routes": best_routes,
+                "total_cost": best_cost
+            })
+
+            # Save the results
+            results.append({
+                "name": graph_filename,
+                "nodes_count": graph.number_of_nodes(),
+                "edges_count": graph.number_of_edges(),
+                "vehicles_amounts": vehicles_results
+            })
+
+        # Append the results to the JSON file
+        save_results_to_json(results, OUTPUT_FILENAME)
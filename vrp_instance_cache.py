@@ -0,0 +1,143 @@
+import hashlib
+import os
+
+import numpy as np
+
+from vrp_utils import (
+    DistanceMatrix,
+    EuclideanWeights,
+    load_distance_matrix,
+    nearest_neighbors,
+    customer_lower_bounds,
+    shortest_path_closure,
+)
+
+# Mixed into every key, so that changing the stored data invalidates the old entries
+CACHE_VERSION = 1
+
+# Bytes read at a time when hashing a file
+HASH_CHUNK = 1 << 20
+
+
+class InstanceCache:
+    """
+    An on-disk cache of parsed graphs and the data derived from them, keyed by file content.
+
+    Every entry is an .npz file in the cache directory named after a hash of the source file's
+    content and the kind of data, so an edited graph file gets new entries and the old ones are
+    simply never read again. Within a process, file hashes are remembered by path, size and
+    modification time, and loaded entries are kept in memory, so repeated runs over the same
+    graphs read neither the graph files nor the cache files again.
+    """
+
+    def __init__(self, directory: str = ".vrp_cache"):
+        self.directory = directory
+        self.hashes = {}
+        self.entries = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def file_hash(self, filename: str) -> str:
+        """
+        Return the hash of a file's content.
+        """
+        status = os.stat(filename)
+        signature = (os.path.abspath(filename), status.st_size, status.st_mtime_ns)
+        digest = self.hashes.get(signature)
+        if digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+            hasher.update(f"v{CACHE_VERSION}|".encode())
+            with open(filename, "rb") as file:
+                while chunk := file.read(HASH_CHUNK):
+                    hasher.update(chunk)
+            digest = self.hashes[signature] = hasher.hexdigest()
+        return digest
+
+    def get(self, filename: str, name: str, compute) -> dict:
+        """
+        Return the arrays derived from a graph file, computing and storing them on a miss.
+
+        Args:
+            filename (str): The graph file.
+            name (str): The kind of data, unique for every computation and its parameters.
+            compute (callable): Returns the arrays as a dict of name to np.ndarray.
+
+        Returns:
+            dict: The arrays.
+        """
+        key = f"{self.file_hash(filename)}_{name}"
+        arrays = self.entries.get(key)
+        if arrays is not None:
+            return arrays
+        path = os.path.join(self.directory, key + ".npz")
+        if os.path.exists(path):
+            with np.load(path) as data:
+                arrays = {array: data[array] for array in data.files}
+        else:
+            arrays = compute()
+            # Written under a temporary name first, so that concurrent runs never read a partial file
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as file:
+                np.savez(file, **arrays)
+            os.replace(temporary, path)
+        self.entries[key] = arrays
+        return arrays
+
+    def distance_matrix(self, filename: str) -> DistanceMatrix:
+        """
+        Load a graph file into a distance matrix, parsing it only on a cache miss.
+
+        Coordinate instances with on-demand distances are stored as their coordinates.
+        """
+
+        def compute() -> dict:
+            distances = load_distance_matrix(filename)
+            labels = np.array(distances.labels, dtype=str)
+            if isinstance(distances.weights, EuclideanWeights):
+                return {"labels": labels, "coordinates": distances.weights.coordinates}
+            return {"labels": labels, "weights": distances.weights}
+
+        arrays = self.get(filename, "distances", compute)
+        if "coordinates" in arrays:
+            return DistanceMatrix(arrays["labels"].tolist(), EuclideanWeights(arrays["coordinates"]))
+        return DistanceMatrix(arrays["labels"].tolist(), arrays["weights"])
+
+    def nearest_neighbors(self, filename: str, k: int, shortest_paths: bool = False) -> np.ndarray:
+        """
+        Return the k nearest neighbors of every node of a graph file, see vrp_utils.nearest_neighbors(),
+        by edge weight or by shortest path length.
+        """
+        load = self.shortest_paths if shortest_paths else self.distance_matrix
+        arrays = self.get(
+            filename,
+            f"{'shortest_' if shortest_paths else ''}neighbors_k{k}",
+            lambda: {"neighbors": nearest_neighbors(load(filename), k)},
+        )
+        return arrays["neighbors"]
+
+    def lower_bounds(self, filename: str, shortest_paths: bool = False) -> np.ndarray:
+        """
+        Return the lower bound on the share of every customer of a graph file, see
+        vrp_utils.customer_lower_bounds(), for the graph or its shortest path closure.
+        """
+        load = self.shortest_paths if shortest_paths else self.distance_matrix
+        arrays = self.get(
+            filename,
+            f"{'shortest_' if shortest_paths else ''}lower_bounds",
+            lambda: {"bounds": customer_lower_bounds(load(filename))},
+        )
+        return arrays["bounds"]
+
+    def shortest_paths(self, filename: str) -> DistanceMatrix:
+        """
+        Return the shortest path closure of a graph file, see vrp_utils.shortest_path_closure().
+        """
+        distances = self.distance_matrix(filename)
+        if isinstance(distances.weights, EuclideanWeights):
+            return distances
+
+        def compute() -> dict:
+            closure = shortest_path_closure(distances)
+            return {"weights": closure.weights, "next_hop": closure.next_hop}
+
+        arrays = self.get(filename, "shortest_paths", compute)
+        return DistanceMatrix(distances.labels, arrays["weights"], arrays["next_hop"], distances.number_of_edges())
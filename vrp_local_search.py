@@ -0,0 +1,515 @@
+import time
+import random
+import numpy as np
+
+from vrp_utils import DistanceMatrix
+
+# Minimum gain for a move to count as an improvement
+EPSILON = 1e-9
+
+# Longest segment moved by Or-opt
+OR_OPT_MAX_SEGMENT = 3
+
+# Kinds of the single moves sampled by the metaheuristics, see sample_move()
+RELOCATE, EXCHANGE, TWO_OPT = range(3)
+
+
+def _path(route: list) -> np.ndarray:
+    return np.array([0] + route + [0], dtype=np.int64)
+
+
+def _timed_out(deadline: float | None) -> bool:
+    return deadline is not None and time.time() > deadline
+
+
+def two_opt(weights: np.ndarray, route: list, deadline: float | None = None) -> float:
+    """
+    Improve a single route in place with 2-opt moves (segment reversals).
+
+    For every edge of the route, the first reversal that shortens the route is applied.
+
+    Args:
+        weights (np.ndarray): The distance matrix weights.
+        route (list): The route of node ids (without the depot), modified in place.
+        deadline (float, optional): Wall-clock time after which the search stops.
+
+    Returns:
+        float: The change of the route cost (zero or negative).
+    """
+    total = 0.0
+    path = _path(route)
+    i = 0
+    while i < len(path) - 3 and not _timed_out(deadline):
+        a, b = path[i], path[i + 1]
+        c, d = path[i + 2 : -1], path[i + 3 :]
+        deltas = weights[a, c] + weights[b, d] - weights[a, b] - weights[c, d]
+        improving = np.flatnonzero(deltas < -EPSILON)
+        if len(improving):
+            j = i + 2 + improving[0]
+            path[i + 1 : j + 1] = path[i + 1 : j + 1][::-1].copy()
+            total += deltas[improving[0]]
+        else:
+            i += 1
+    route[:] = path[1:-1].tolist()
+    return total
+
+
+def or_opt(weights: np.ndarray, route: list, deadline: float | None = None) -> float:
+    """
+    Improve a single route in place with Or-opt moves.
+
+    Segments of up to OR_OPT_MAX_SEGMENT consecutive nodes are moved, possibly reversed,
+    to the first position in the route where they shorten it.
+
+    Args:
+        weights (np.ndarray): The distance matrix weights.
+        route (list): The route of node ids (without the depot), modified in place.
+        deadline (float, optional): Wall-clock time after which the search stops.
+
+    Returns:
+        float: The change of the route cost (zero or negative).
+    """
+    total = 0.0
+    for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+        i = 0
+        while i + length <= len(route) and not _timed_out(deadline):
+            segment = route[i : i + length]
+            rest = route[:i] + route[i + length :]
+            path = _path(route)
+            first, last = segment[0], segment[-1]
+            prev, succ = path[i], path[i + length + 1]
+            removal = weights[prev, first] + weights[last, succ] - weights[prev, succ]
+
+            # Insert between consecutive nodes of the remaining route, in either direction
+            rest_path = _path(rest)
+            u, v = rest_path[:-1], rest_path[1:]
+            forward = weights[u, first] + weights[last, v] - weights[u, v] - removal
+            backward = weights[u, last] + weights[first, v] - weights[u, v] - removal
+            deltas = np.minimum(forward, backward)
+            deltas[i] = 0  # Reinserting in the same place is not a move
+            improving = np.flatnonzero(deltas < -EPSILON)
+            if len(improving):
+                k = improving[0]
+                if backward[k] < forward[k]:
+                    segment.reverse()
+                route[:] = rest[:k] + segment + rest[k:]
+                total += deltas[k]
+            else:
+                i += 1
+    return total
+
+
+def relocate(weights: np.ndarray, routes: list, deadline: float | None = None) -> float:
+    """
+    Improve a solution in place by moving single nodes to other routes.
+
+    Each node is moved to the cheapest position of the first other route where the move
+    lowers the total cost. A route is never emptied.
+
+    Args:
+        weights (np.ndarray): The distance matrix weights.
+        routes (list): The routes of node ids (without the depot), modified in place.
+        deadline (float, optional): Wall-clock time after which the search stops.
+
+    Returns:
+        float: The change of the total cost (zero or negative).
+    """
+    total = 0.0
+    for r1, route1 in enumerate(routes):
+        i = 0
+        # The last node of a route stays, so that every vehicle keeps serving a customer
+        while i < len(route1) and len(route1) > 1 and not _timed_out(deadline):
+            path1 = _path(route1)
+            node = path1[i + 1]
+            removal = weights[path1[i], node] + weights[node, path1[i + 2]] - weights[path1[i], path1[i + 2]]
+            moved = False
+            for r2, route2 in enumerate(routes):
+                if r2 == r1:
+                    continue
+                path2 = _path(route2)
+                u, v = path2[:-1], path2[1:]
+                deltas = weights[u, node] + weights[node, v] - weights[u, v] - removal
+                k = int(np.argmin(deltas))
+                if deltas[k] < -EPSILON:
+                    route2.insert(k, int(node))
+                    del route1[i]
+                    total += deltas[k]
+                    moved = True
+                    break
+            if not moved:
+                i += 1
+    return total
+
+
+def exchange(weights: np.ndarray, routes: list, deadline: float | None = None) -> float:
+    """
+    Improve a solution in place by swapping pairs of nodes between routes.
+
+    Each node is swapped with the best node of the first other route where the swap lowers
+    the total cost.
+
+    Args:
+        weights (np.ndarray): The distance matrix weights.
+        routes (list): The routes of node ids (without the depot), modified in place.
+        deadline (float, optional): Wall-clock time after which the search stops.
+
+    Returns:
+        float: The change of the total cost (zero or negative).
+    """
+    total = 0.0
+    for r1, route1 in enumerate(routes):
+        for i in range(len(route1)):
+            if _timed_out(deadline):
+                return total
+            for r2 in range(r1 + 1, len(routes)):
+                route2 = routes[r2]
+                if not route2:
+                    continue
+                path1, path2 = _path(route1), _path(route2)
+                x, prev1, succ1 = path1[i + 1], path1[i], path1[i + 2]
+                y, prev2, succ2 = path2[1:-1], path2[:-2], path2[2:]
+                deltas = (
+                    weights[prev1, y] + weights[y, succ1] - weights[prev1, x] - weights[x, succ1]
+                    + weights[prev2, x] + weights[x, succ2] - weights[prev2, y] - weights[y, succ2]
+                )
+                k = int(np.argmin(deltas))
+                if deltas[k] < -EPSILON:
+                    route1[i], route2[k] = route2[k], route1[i]
+                    total += deltas[k]
+                    break
+    return total
+
+
+class RoutePositions:
+    """
+    Route and position of every node, re-indexed only where a move shifts nodes.
+    """
+
+    __slots__ = ("routes", "route_of", "index_of")
+
+    def __init__(self, routes: list, size: int):
+        self.routes = routes
+        self.route_of = [-1] * size
+        self.index_of = [-1] * size
+        for r in range(len(routes)):
+            self.refresh(r)
+
+    def refresh(self, r: int, start: int = 0, end: int = None):
+        """
+        Re-index the nodes at positions start to end (exclusive, None = route end) of route r.
+        """
+        route = self.routes[r]
+        for i in range(start, len(route) if end is None else end):
+            node = route[i]
+            self.route_of[node] = r
+            self.index_of[node] = i
+
+    def relocate(self, x: int, c: int, after: bool):
+        """
+        Move node x right after (or right before) node c, in the same or another route.
+        """
+        r1, r2 = self.route_of[x], self.route_of[c]
+        i = self.index_of[x]
+        del self.routes[r1][i]
+        j = self.index_of[c] + after
+        if r1 == r2:
+            if j > i:
+                j -= 1
+            self.routes[r1].insert(j, x)
+            self.refresh(r1, min(i, j), max(i, j) + 1)
+        else:
+            self.routes[r2].insert(j, x)
+            self.refresh(r1, i)
+            self.refresh(r2, j)
+
+    def exchange(self, x: int, y: int):
+        """
+        Swap nodes x and y, in the same or different routes.
+        """
+        r1, r2 = self.route_of[x], self.route_of[y]
+        i, j = self.index_of[x], self.index_of[y]
+        self.routes[r1][i], self.routes[r2][j] = y, x
+        self.route_of[x], self.route_of[y] = r2, r1
+        self.index_of[x], self.index_of[y] = j, i
+
+    def pred(self, node: int) -> int:
+        i = self.index_of[node]
+        return self.routes[self.route_of[node]][i - 1] if i > 0 else 0
+
+    def succ(self, node: int) -> int:
+        route = self.routes[self.route_of[node]]
+        i = self.index_of[node]
+        return route[i + 1] if i + 1 < len(route) else 0
+
+
+def granular_two_opt(weights: np.ndarray, positions: RoutePositions, neighbors: np.ndarray, deadline: float | None = None) -> float:
+    """
+    Improve every route in place with 2-opt moves restricted to nearest-neighbor edges.
+
+    A reversal is only tried if it creates an edge between a node and one of its neighbors.
+
+    Args:
+        weights (np.ndarray): The distance matrix weights.
+        positions (RoutePositions): The routes with their position lookup, modified in place.
+        neighbors (np.ndarray): The nearest neighbors of every node.
+        deadline (float, optional): Wall-clock time after which the search stops.
+
+    Returns:
+        float: The change of the total cost (zero or negative).
+    """
+    total = 0.0
+    for r, route in enumerate(positions.routes):
+        i = -1  # Position of the first node of the removed edge, -1 being the depot
+        while i < len(route) - 1 and not _timed_out(deadline):
+            a = route[i] if i >= 0 else 0
+            b = route[i + 1]
+            improved = False
+            for c in neighbors[a].tolist():
+                j = positions.index_of[c]
+                if positions.route_of[c] != r or j <= i + 1:
+                    continue
+                d = route[j + 1] if j + 1 < len(route) else 0
+                delta = weights[a, c] + weights[b, d] - weights[a, b] - weights[c, d]
+                if delta < -EPSILON:
+                    route[i + 1 : j + 1] = route[i + 1 : j + 1][::-1]
+                    positions.refresh(r, i + 1, j + 1)
+                    total += delta
+                    improved = True
+                    break
+            if not improved:
+                i += 1
+    return total
+
+
+def granular_relocate(weights: np.ndarray, positions: RoutePositions, neighbors: np.ndarray, deadline: float | None = None) -> float:
+    """
+    Improve a solution in place by moving single nodes next to one of their neighbors.
+
+    Each node is tried right after and right before each of its nearest neighbors, in the
+    same or another route, and the first improving position is applied. A route is never
+    emptied.
+
+    Args:
+        weights (np.ndarray): The distance matrix weights.
+        positions (RoutePositions): The routes with their position lookup, modified in place.
+        neighbors (np.ndarray): The nearest neighbors of every node.
+        deadline (float, optional): Wall-clock time after which the search stops.
+
+    Returns:
+        float: The change of the total cost (zero or negative).
+    """
+    total = 0.0
+    routes = positions.routes
+    for x in range(1, len(positions.route_of)):
+        if _timed_out(deadline):
+            break
+        # The last node of a route stays, so that every vehicle keeps serving a customer
+        if len(routes[positions.route_of[x]]) == 1:
+            continue
+        prev, succ = positions.pred(x), positions.succ(x)
+        removal = weights[prev, x] + weights[x, succ] - weights[prev, succ]
+        for c in neighbors[x].tolist():
+            if c == prev or c == succ:
+                continue
+            # Insert between c and its successor, or between its predecessor and c
+            for u, v, after in ((c, positions.succ(c), True), (positions.pred(c), c, False)):
+                delta = weights[u, x] + weights[x, v] - weights[u, v] - removal
+                if delta < -EPSILON:
+                    break
+            else:
+                continue
+            positions.relocate(x, c, after)
+            total += delta
+            break
+    return total
+
+
+def granular_exchange(weights: np.ndarray, positions: RoutePositions, neighbors: np.ndarray, deadline: float | None = None) -> float:
+    """
+    Improve a solution in place by swapping nodes of different routes.
+
+    A node is only swapped with the successor or predecessor of one of its nearest neighbors,
+    so that the swap places it next to that neighbor.
+
+    Args:
+        weights (np.ndarray): The distance matrix weights.
+        positions (RoutePositions): The routes with their position lookup, modified in place.
+        neighbors (np.ndarray): The nearest neighbors of every node.
+        deadline (float, optional): Wall-clock time after which the search stops.
+
+    Returns:
+        float: The change of the total cost (zero or negative).
+    """
+    total = 0.0
+    for x in range(1, len(positions.route_of)):
+        if _timed_out(deadline):
+            break
+        r1 = positions.route_of[x]
+        for c in neighbors[x].tolist():
+            r2 = positions.route_of[c]
+            if r2 == r1:
+                continue
+            for y in (positions.succ(c), positions.pred(c)):
+                if y == 0:
+                    continue
+                prev1, succ1 = positions.pred(x), positions.succ(x)
+                prev2, succ2 = positions.pred(y), positions.succ(y)
+                delta = (
+                    weights[prev1, y] + weights[y, succ1] - weights[prev1, x] - weights[x, succ1]
+                    + weights[prev2, x] + weights[x, succ2] - weights[prev2, y] - weights[y, succ2]
+                )
+                if delta < -EPSILON:
+                    break
+            else:
+                continue
+            positions.exchange(x, y)
+            total += delta
+            break
+    return total
+
+
+def local_search(
+    distances: DistanceMatrix, routes: list, deadline: float | None = None, neighbors: np.ndarray = None
+) -> float:
+    """
+    Improve a solution in place with 2-opt, Or-opt, relocate and exchange moves.
+
+    Every move is evaluated from the edges it changes only, and the first improving move
+    found for each node or edge is applied. The neighborhoods are scanned until none of
+    them improves the solution or the deadline passes. Given nearest-neighbor lists, only
+    moves that create an edge to one of a node's neighbors are considered (granular search),
+    which makes a scan O(n * k) instead of O(n^2).
+
+    Args:
+        distances (DistanceMatrix): The distance matrix representing the VRP problem.
+        routes (list): The routes of node ids (without the depot), modified in place.
+        deadline (float, optional): Wall-clock time after which the search stops.
+        neighbors (np.ndarray, optional): The nearest neighbors of every node.
+
+    Returns:
+        float: The change of the total cost (zero or negative).
+    """
+    weights = distances.weights
+    positions = RoutePositions(routes, len(neighbors)) if neighbors is not None else None
+    total = 0.0
+    while not _timed_out(deadline):
+        improvement = 0.0
+        if positions is not None:
+            improvement += granular_two_opt(weights, positions, neighbors, deadline)
+            improvement += granular_relocate(weights, positions, neighbors, deadline)
+            improvement += granular_exchange(weights, positions, neighbors, deadline)
+        else:
+            for route in routes:
+                improvement += two_opt(weights, route, deadline)
+                improvement += or_opt(weights, route, deadline)
+            improvement += relocate(weights, routes, deadline)
+            improvement += exchange(weights, routes, deadline)
+        total += improvement
+        if improvement >= -EPSILON:
+            break
+    return total
+
+
+def sample_move(positions: RoutePositions, neighbors: list) -> tuple | None:
+    """
+    Draw a random granular move that places a random node next to one of its neighbors.
+
+    A move is a tuple (kind, x, c, after): RELOCATE moves x right after (or before) c,
+    EXCHANGE swaps x with the successor (or predecessor) of c, and TWO_OPT reverses the part
+    of a route between x and c, or exchanges the route tails behind x and before c when they
+    are on different routes.
+
+    Args:
+        positions (RoutePositions): The routes with their position lookup.
+        neighbors (list): The nearest neighbors of every node, as lists.
+
+    Returns:
+        tuple | None: The move, or None if the drawn move would not change the solution.
+    """
+    x = random.randrange(1, len(positions.route_of))
+    c = random.choice(neighbors[x])
+    kind = random.randrange(3)
+    after = random.random() < 0.5
+    if kind == RELOCATE:
+        if (positions.succ(c) if after else positions.pred(c)) == x:
+            return None
+    elif kind == EXCHANGE:
+        y = positions.succ(c) if after else positions.pred(c)
+        if y == 0 or y == x:
+            return None
+    elif positions.route_of[x] == positions.route_of[c]:
+        i, j = positions.index_of[x], positions.index_of[c]
+        if abs(i - j) < 2:
+            return None
+    return kind, x, c, after
+
+
+def move_edges(positions: RoutePositions, move: tuple) -> tuple:
+    """
+    List the edges removed and added by a move, without applying it.
+
+    The cost change of a move is the weight of the added edges minus the weight of the
+    removed ones, so it is evaluated in constant time whatever the route lengths.
+
+    Args:
+        positions (RoutePositions): The routes with their position lookup.
+        move (tuple): A move drawn by sample_move().
+
+    Returns:
+        tuple: The removed and the added edges, as lists of node pairs.
+    """
+    kind, x, c, after = move
+    pred, succ = positions.pred, positions.succ
+    if kind == RELOCATE:
+        p, s = pred(x), succ(x)
+        u, v = (c, succ(c)) if after else (pred(c), c)
+        return [(p, x), (x, s), (u, v)], [(p, s), (u, x), (x, v)]
+    if kind == EXCHANGE:
+        y = succ(c) if after else pred(c)
+        p1, s1, p2, s2 = pred(x), succ(x), pred(y), succ(y)
+        # The edge between adjacent nodes stays in place
+        if s1 == y:
+            return [(p1, x), (y, s2)], [(p1, y), (x, s2)]
+        if s2 == x:
+            return [(p2, y), (x, s1)], [(p2, x), (y, s1)]
+        return [(p1, x), (x, s1), (p2, y), (y, s2)], [(p1, y), (y, s1), (p2, x), (x, s2)]
+    if positions.route_of[x] == positions.route_of[c]:
+        first, second = (x, c) if positions.index_of[x] < positions.index_of[c] else (c, x)
+        b, d = succ(first), succ(second)
+        return [(first, b), (second, d)], [(first, second), (b, d)]
+    b, p = succ(x), pred(c)
+    return [(x, b), (p, c)], [(x, c), (p, b)]
+
+
+def edges_cost(weights: list, edges: list) -> float:
+    """
+    Sum the weights of a list of edges, given the weights as returned by vrp_utils.scalar_weights().
+    """
+    return sum(weights[a][b] for a, b in edges)
+
+
+def apply_move(positions: RoutePositions, move: tuple):
+    """
+    Apply a move drawn by sample_move() to the routes in place.
+
+    Args:
+        positions (RoutePositions): The routes with their position lookup, modified in place.
+        move (tuple): The move.
+    """
+    kind, x, c, after = move
+    routes = positions.routes
+    r1, r2 = positions.route_of[x], positions.route_of[c]
+    # Only the nodes whose position changes are re-indexed
+    if kind == RELOCATE:
+        positions.relocate(x, c, after)
+    elif kind == EXCHANGE:
+        positions.exchange(x, positions.succ(c) if after else positions.pred(c))
+    elif r1 == r2:
+        i, j = sorted((positions.index_of[x], positions.index_of[c]))
+        routes[r1][i + 1 : j + 1] = routes[r1][i + 1 : j + 1][::-1]
+        positions.refresh(r1, i + 1, j + 1)
+    else:
+        i, j = positions.index_of[x], positions.index_of[c]
+        routes[r1], routes[r2] = routes[r1][: i + 1] + routes[r2][j:], routes[r2][:j] + routes[r1][i + 1 :]
+        positions.refresh(r1, i + 1)
+        positions.refresh(r2, j)
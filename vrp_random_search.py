@@ -1,16 +1,23 @@
 import networkx as nx
+import numpy as np
 import itertools
 import sys
 import os
 import json
 import time
 from vrp_utils import (
-    load_graph,
-    calculate_route_cost,
+    load_distance_matrix,
+    as_distance_matrix,
+    calculate_route_costs,
+    swap_route_costs,
+    optimal_split,
+    nearest_neighbors,
     save_results_to_json,
-    couple_routes,
-    decouple_routes,
+    StopCondition,
 )
+from vrp_instance_cache import InstanceCache
+from vrp_chromosome import Chromosome
+from vrp_fitness_cache import FitnessCache
 import random
 
 INPUT_GRAPHS = "5-1000_1"
@@ -19,44 +26,117 @@ INPUT_DIR = f"graphs/{INPUT_GRAPHS}"
 OUTPUT_FILENAME = f"results/algs_to_compare/{INPUT_GRAPHS}_RS_i1000.json"
 
 VEHICLES_AMOUNTS = [1, 2, 3, 4]
-
-
-def vrp_random_search(graph: nx.Graph, vehicles_amount: int, iterations: int) -> tuple:
+SHORTEST_PATHS = False  # Route through intermediate nodes of sparse graphs (see vrp_utils.shortest_path_closure)
+
+
+def vrp_random_search(
+    graph: nx.Graph,
+    vehicles_amount: int,
+    iterations: int,
+    split: bool = False,
+    neighbors_k: int = None,
+    cache: FitnessCache = None,
+    stop: StopCondition = None,
+) -> tuple:
     """
     Solve the Vehicle Routing Problem using random search.
 
     Parameters:
-    graph (networkx.Graph): The graph
+    graph (networkx.Graph | DistanceMatrix): The graph
     vehicles_amount (int): The number of vehicles
     iterations (int): The number of iterations for the random search
+    split (bool): Score every visiting order by its optimal split into routes instead of
+        keeping the initial route lengths
+    neighbors_k (int): Only swap a node behind one of its k nearest neighbors (None = any pair)
+    cache (FitnessCache): Remember the split of revisited visiting orders (split mode only)
+    stop (StopCondition): Stop before the last iteration once these criteria are met, patience
+        being counted in iterations, or when interrupted
 
     Returns:
     best_routes (list of lists): The best routes for each vehicle
     best_cost (int): The total cost of the best routes
     """
-    nodes = list(graph.nodes)
-    nodes.remove(
-        "A"
-    )  # Remove 'A' from nodes to ensure it is only used as start and end
+    distances = as_distance_matrix(graph)
+    nodes = distances.customers()  # The depot is only used as start and end
     best_cost = sys.maxsize
-    best_routes = None
+    best_tour = None
     iteration_counter = 0
 
     random.shuffle(nodes)
-    routes = [nodes[i::vehicles_amount] for i in range(vehicles_amount)]
-
-    while iteration_counter < iterations:
-        vehicles_routes_lengths, coupled_routes = couple_routes(routes)
-        idx1, idx2 = random.sample(range(len(nodes)), 2)
-        nodes[idx1], nodes[idx2] = nodes[idx2], nodes[idx1]
-        routes = decouple_routes(vehicles_routes_lengths, coupled_routes)
-        cost = sum(calculate_route_cost(graph, route) for route in routes)
-        if cost < best_cost:
-            best_cost = cost
-            best_routes = routes
-        iteration_counter += 1
-
-    return best_routes, best_cost
+    chromosome = Chromosome.from_routes([nodes[i::vehicles_amount] for i in range(vehicles_amount)])
+    # Plain lists are faster than arrays for the scalar accesses of single moves
+    tour = chromosome.tour.tolist()
+    bounds = chromosome.bounds.tolist()
+    route_costs = calculate_route_costs(distances, tour, bounds)
+    cost = sum(route_costs)
+
+    neighbors = None
+    if neighbors_k and len(tour) > 1:
+        neighbors = nearest_neighbors(distances, neighbors_k).tolist()
+        position = [0] * len(distances.labels)
+        for i, node in enumerate(tour):
+            position[node] = i
+
+    def random_swap() -> tuple:
+        if neighbors is None:
+            return random.sample(range(len(tour)), 2)
+        # Move a random neighbor of a random node right behind it
+        idx1 = random.randrange(len(tour) - 1)
+        idx2 = position[random.choice(neighbors[tour[idx1]])]
+        idx1 += 1
+        if idx1 != idx2:
+            position[tour[idx1]], position[tour[idx2]] = idx2, idx1
+        return idx1, idx2
+
+    try:
+        while iteration_counter < iterations:
+            if split:
+                if len(tour) > 1:
+                    idx1, idx2 = random_swap()
+                    tour[idx1], tour[idx2] = tour[idx2], tour[idx1]
+                if cache is not None:
+                    costs, split_bounds = cache.evaluate(
+                        np.array([tour]),
+                        np.array([bounds]),
+                        lambda tours, _: optimal_split(distances, tours, vehicles_amount, use_all_vehicles=True),
+                        split=True,
+                    )
+                else:
+                    costs, split_bounds = optimal_split(
+                        distances, np.array([tour]), vehicles_amount, use_all_vehicles=True
+                    )
+                cost = costs[0]
+                bounds = split_bounds[0].tolist()
+            elif len(tour) > 1:
+                idx1, idx2 = random_swap()
+                # Only the edges around the swapped nodes are re-evaluated
+                route_costs_update = swap_route_costs(
+                    distances, tour, bounds, route_costs, idx1, idx2
+                )
+                for route, route_cost in route_costs_update.items():
+                    route_costs[route] = route_cost
+                tour[idx1], tour[idx2] = tour[idx2], tour[idx1]
+                cost = sum(route_costs)
+            if cost < best_cost:
+                best_cost = int(cost)
+                best_tour = tour.copy()
+                best_bounds = bounds.copy()
+            iteration_counter += 1
+            if stop is not None:
+                stop.record(cost)
+                if stop.should_stop():
+                    break
+    except KeyboardInterrupt:
+        # Return the best solution found so far
+        if stop is None or best_tour is None:
+            raise
+        stop.interrupted = True
+
+    if best_tour is None:
+        return None, best_cost
+    chromosome.tour[:] = best_tour
+    chromosome.bounds[:] = best_bounds
+    return chromosome.to_labels(distances), best_cost
 
 
 if __name__ == "__main__":
@@ -64,12 +144,13 @@ if __name__ == "__main__":
 
     # Initialize the JSON file
     save_results_to_json(results, OUTPUT_FILENAME)
+    instances = InstanceCache() if SHORTEST_PATHS else None
 
     for f in sorted(os.listdir(INPUT_DIR)):
         graph_filename = os.path.join(INPUT_DIR, f)
         print(f"Processing {graph_filename}")
-        # Load the graph
-        graph = load_graph(graph_filename)
+        # Load the graph (or its shortest path closure, cached between runs)
+        graph = instances.shortest_paths(graph_filename) if instances else load_distance_matrix(graph_filename)
         vehicles_results = []
         for vehicles_amount in VEHICLES_AMOUNTS:
             start_time = time.time()
@@ -79,6 +160,7 @@ if __name__ == "__main__":
             )
             end_time = time.time()
             execution_time = end_time - start_time
+            best_routes = graph.expand_routes(best_routes)
 
             # Print the best routes, their cost, and execution time
             print(f"Best routes: {best_routes}")
@@ -0,0 +1,95 @@
+import networkx as nx
+import sys
+import os
+import time
+from vrp_utils import (
+    load_distance_matrix,
+    as_distance_matrix,
+    calculate_route_cost_matrix,
+    save_results_to_json,
+)
+from vrp_instance_cache import InstanceCache
+from vrp_construction import savings_routes
+
+INPUT_GRAPHS = "5-1000_1"
+INPUT_DIR = f"graphs/{INPUT_GRAPHS}"
+
+OUTPUT_FILENAME = f"results/algs_to_compare/{INPUT_GRAPHS}_VRP_a-CW.json"
+
+VEHICLES_AMOUNTS = [1, 2, 3, 4]
+SHORTEST_PATHS = False  # Route through intermediate nodes of sparse graphs (see vrp_utils.shortest_path_closure)
+
+
+def vrp_savings(graph: nx.Graph, vehicles_amount: int) -> tuple:
+    """
+    Solve the Vehicle Routing Problem using the Clarke-Wright savings algorithm.
+
+    Customers start on routes of their own, which are merged by decreasing savings (with a
+    union-find over route membership) until vehicles_amount routes are left. The algorithm is
+    deterministic and takes O(n^2 log n) time, dominated by sorting the savings.
+
+    Parameters:
+    graph (networkx.Graph | DistanceMatrix): The graph
+    vehicles_amount (int): The number of vehicles
+
+    Returns:
+    best_routes (list of lists): The routes of each vehicle
+    best_cost (int): The total cost of the routes
+    """
+    distances = as_distance_matrix(graph)
+    routes = savings_routes(distances, vehicles_amount)
+    cost = sum(calculate_route_cost_matrix(distances, route) for route in routes)
+    if cost >= sys.maxsize:
+        return None, sys.maxsize
+    routes += [[] for _ in range(vehicles_amount - len(routes))]
+    return [distances.to_labels([0] + route + [0]) for route in routes], int(cost)
+
+
+if __name__ == "__main__":
+    results = []
+
+    # Initialize the JSON file
+    save_results_to_json(results, OUTPUT_FILENAME)
+    instances = InstanceCache() if SHORTEST_PATHS else None
+
+    for f in sorted(os.listdir(INPUT_DIR)):
+        graph_filename = os.path.join(INPUT_DIR, f)
+        print(f"Processing {graph_filename}")
+        # Load the graph (or its shortest path closure, cached between runs)
+        graph = instances.shortest_paths(graph_filename) if instances else load_distance_matrix(graph_filename)
+        vehicles_results = []
+        for vehicles_amount in VEHICLES_AMOUNTS:
+            start_time = time.time()
+            # Solve VRP using the savings algorithm
+            best_routes, best_cost = vrp_savings(graph, vehicles_amount)
+            end_time = time.time()
+            execution_time = end_time - start_time
+            best_routes = graph.expand_routes(best_routes)
+
+            # Print the best routes, their cost, and execution time
+            print(f"Best routes: {best_routes}")
+            print(f"Total cost: {best_cost}")
+            print(f"Vehicles amount: {vehicles_amount}")
+            print(f"Execution time: {execution_time} seconds\n")
+
+            vehicles_results.append(
+                {
+                    "vehicles_amount": vehicles_amount,
+                    "execution_time": execution_time,
+                    "best_routes": best_routes,
+                    "total_cost": best_cost,
+                }
+            )
+
+            # Save the results
+            results.append(
+                {
+                    "name": graph_filename,
+                    "nodes_count": graph.number_of_nodes(),
+                    "edges_count": graph.number_of_edges(),
+                    "vehicles_amounts": vehicles_results,
+                }
+            )
+
+        # Append the results to the JSON file
+        save_results_to_json(results, OUTPUT_FILENAME)
@@ -0,0 +1,186 @@
+import networkx as nx
+import math
+import sys
+import os
+import time
+import random
+from vrp_utils import (
+    load_distance_matrix,
+    as_distance_matrix,
+    calculate_route_cost_matrix,
+    nearest_neighbors,
+    scalar_weights,
+    save_results_to_json,
+    StopCondition,
+    get_routes,
+)
+from vrp_instance_cache import InstanceCache
+from vrp_construction import savings_routes
+from vrp_local_search import RoutePositions, sample_move, move_edges, edges_cost, apply_move
+
+INPUT_GRAPHS = "5-1000_1"
+INPUT_DIR = f"graphs/{INPUT_GRAPHS}"
+
+OUTPUT_FILENAME = f"results/algs_to_compare/{INPUT_GRAPHS}_VRP_a-SA.json"
+
+VEHICLES_AMOUNTS = [1, 2, 3, 4]
+SHORTEST_PATHS = False  # Route through intermediate nodes of sparse graphs (see vrp_utils.shortest_path_closure)
+
+ITERATIONS = 500000
+NEIGHBORS_K = 10  # Moves place a node next to one of its k nearest neighbors
+INITIAL_ACCEPTANCE = 0.5  # Probability of accepting an average worsening move at the start
+FINAL_TEMPERATURE_RATIO = 1e-3  # Final temperature relative to the initial one
+TEMPERATURE_SAMPLES = 200  # Moves sampled to estimate the initial temperature
+
+
+def initial_temperature(weights: list, positions: RoutePositions, neighbors: list) -> float:
+    """
+    Estimate the temperature at which an average worsening move is accepted with the
+    probability INITIAL_ACCEPTANCE.
+
+    Parameters:
+    weights (list): The distance matrix weights, see vrp_utils.scalar_weights()
+    positions (RoutePositions): The routes with their position lookup
+    neighbors (list): The nearest neighbors of every node
+
+    Returns:
+    temperature (float): The initial temperature
+    """
+    worsening = []
+    for _ in range(TEMPERATURE_SAMPLES):
+        move = sample_move(positions, neighbors)
+        if move is None:
+            continue
+        removed, added = move_edges(positions, move)
+        delta = edges_cost(weights, added) - edges_cost(weights, removed)
+        if 0 < delta < math.inf:
+            worsening.append(delta)
+    if not worsening:
+        return 1.0
+    return -sum(worsening) / len(worsening) / math.log(INITIAL_ACCEPTANCE)
+
+
+def vrp_simulated_annealing(
+    graph: nx.Graph,
+    vehicles_amount: int,
+    iterations: int = ITERATIONS,
+    neighbors_k: int = NEIGHBORS_K,
+    stop: StopCondition = None,
+) -> tuple:
+    """
+    Solve the Vehicle Routing Problem using simulated annealing.
+
+    The search starts from the Clarke-Wright savings routes and draws one random granular
+    move (relocate, exchange, 2-opt or 2-opt*) per iteration. A move is evaluated from the
+    edges it removes and adds only, and accepted if it improves the solution or with the
+    probability exp(-delta / T). The temperature T decreases geometrically from the initial
+    estimate to FINAL_TEMPERATURE_RATIO of it over the iterations.
+
+    Parameters:
+    graph (networkx.Graph | DistanceMatrix): The graph
+    vehicles_amount (int): The number of vehicles
+    iterations (int): The number of iterations
+    neighbors_k (int): The number of nearest neighbors considered for every node
+    stop (StopCondition): Stop before the last iteration once these criteria are met, patience
+        being counted in iterations, or when interrupted
+
+    Returns:
+    best_routes (list of lists): The best routes for each vehicle
+    best_cost (int): The total cost of the best routes
+    """
+    distances = as_distance_matrix(graph)
+    routes = savings_routes(distances, vehicles_amount)
+    routes += [[] for _ in range(vehicles_amount - len(routes))]
+    best_routes = [route.copy() for route in routes]
+
+    if distances.number_of_nodes() > 2:
+        # Plain lists are faster than arrays for the scalar accesses of single moves
+        weights = scalar_weights(distances)
+        neighbors = nearest_neighbors(distances, neighbors_k).tolist()
+        positions = RoutePositions(routes, distances.number_of_nodes())
+        cost = best_cost = sum(calculate_route_cost_matrix(distances, route) for route in routes)
+
+        temperature = initial_temperature(weights, positions, neighbors)
+        cooling = FINAL_TEMPERATURE_RATIO ** (1 / max(iterations, 1))
+        try:
+            for _ in range(iterations):
+                move = sample_move(positions, neighbors)
+                if move is not None:
+                    removed, added = move_edges(positions, move)
+                    delta = edges_cost(weights, added) - edges_cost(weights, removed)
+                    # A move through a missing edge has an undefined (nan) delta and is rejected
+                    if delta <= 0 or random.random() < math.exp(-delta / temperature):
+                        apply_move(positions, move)
+                        cost += delta
+                        if not math.isfinite(cost):
+                            cost = sum(calculate_route_cost_matrix(distances, route) for route in routes)
+                        if cost < best_cost:
+                            best_cost = cost
+                            best_routes = [route.copy() for route in routes]
+                temperature *= cooling
+                if stop is not None:
+                    stop.record(cost)
+                    if stop.should_stop():
+                        break
+        except KeyboardInterrupt:
+            # Return the best solution found so far
+            if stop is None:
+                raise
+            stop.interrupted = True
+
+    # The running cost accumulates rounding errors, so the best routes are summed again
+    best_cost = sum(calculate_route_cost_matrix(distances, route) for route in best_routes)
+    if best_cost >= sys.maxsize:
+        return None, sys.maxsize
+    return [distances.to_labels(route) for route in best_routes], int(best_cost)
+
+
+if __name__ == "__main__":
+    results = []
+
+    # Initialize the JSON file
+    save_results_to_json(results, OUTPUT_FILENAME)
+    instances = InstanceCache() if SHORTEST_PATHS else None
+
+    for f in sorted(os.listdir(INPUT_DIR)):
+        graph_filename = os.path.join(INPUT_DIR, f)
+        print(f"Processing {graph_filename}")
+        # Load the graph (or its shortest path closure, cached between runs)
+        graph = instances.shortest_paths(graph_filename) if instances else load_distance_matrix(graph_filename)
+        vehicles_results = []
+        for vehicles_amount in VEHICLES_AMOUNTS:
+            start_time = time.time()
+            # Solve VRP using simulated annealing
+            best_routes, best_cost = vrp_simulated_annealing(graph, vehicles_amount)
+            end_time = time.time()
+            execution_time = end_time - start_time
+            if best_routes is not None:
+                best_routes = graph.expand_routes(get_routes(best_routes))
+
+            # Print the best routes, their cost, and execution time
+            print(f"Best routes: {best_routes}")
+            print(f"Total cost: {best_cost}")
+            print(f"Vehicles amount: {vehicles_amount}")
+            print(f"Execution time: {execution_time} seconds\n")
+
+            vehicles_results.append(
+                {
+                    "vehicles_amount": vehicles_amount,
+                    "execution_time": execution_time,
+                    "best_routes": best_routes,
+                    "total_cost": best_cost,
+                }
+            )
+
+            # Save the results
+            results.append(
+                {
+                    "name": graph_filename,
+                    "nodes_count": graph.number_of_nodes(),
+                    "edges_count": graph.number_of_edges(),
+                    "vehicles_amounts": vehicles_results,
+                }
+            )
+
+        # Append the results to the JSON file
+        save_results_to_json(results, OUTPUT_FILENAME)
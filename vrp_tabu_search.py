@@ -0,0 +1,178 @@
+import networkx as nx
+import math
+import sys
+import os
+import time
+import random
+from vrp_utils import (
+    load_distance_matrix,
+    as_distance_matrix,
+    calculate_route_cost_matrix,
+    nearest_neighbors,
+    scalar_weights,
+    save_results_to_json,
+    StopCondition,
+    get_routes,
+)
+from vrp_instance_cache import InstanceCache
+from vrp_construction import savings_routes
+from vrp_local_search import RoutePositions, sample_move, move_edges, edges_cost, apply_move
+
+INPUT_GRAPHS = "5-1000_1"
+INPUT_DIR = f"graphs/{INPUT_GRAPHS}"
+
+OUTPUT_FILENAME = f"results/algs_to_compare/{INPUT_GRAPHS}_VRP_a-TS.json"
+
+VEHICLES_AMOUNTS = [1, 2, 3, 4]
+SHORTEST_PATHS = False  # Route through intermediate nodes of sparse graphs (see vrp_utils.shortest_path_closure)
+
+ITERATIONS = 30000
+NEIGHBORS_K = 10  # Moves place a node next to one of its k nearest neighbors
+CANDIDATE_MOVES = 50  # Random moves evaluated per iteration, the best admissible one is applied
+TABU_TENURE = (10, 30)  # Range of the number of iterations a removed edge stays tabu
+
+
+def _edge(a: int, b: int) -> tuple:
+    return (a, b) if a < b else (b, a)
+
+
+def vrp_tabu_search(
+    graph: nx.Graph,
+    vehicles_amount: int,
+    iterations: int = ITERATIONS,
+    neighbors_k: int = NEIGHBORS_K,
+    candidates: int = CANDIDATE_MOVES,
+    stop: StopCondition = None,
+) -> tuple:
+    """
+    Solve the Vehicle Routing Problem using tabu search.
+
+    The search starts from the Clarke-Wright savings routes. Every iteration evaluates a
+    sample of random granular moves (relocate, exchange, 2-opt or 2-opt*) from the edges they
+    remove and add only, and applies the best one that is not tabu, even if it worsens the
+    solution. The edges removed by a move become tabu for a random number of iterations: a
+    move adding one of them back is only allowed if it leads to a new best solution
+    (aspiration). The tabu list is a dict from edge to the iteration its tenure ends, so
+    checking a move takes constant time.
+
+    Parameters:
+    graph (networkx.Graph | DistanceMatrix): The graph
+    vehicles_amount (int): The number of vehicles
+    iterations (int): The number of iterations
+    neighbors_k (int): The number of nearest neighbors considered for every node
+    candidates (int): The number of moves sampled per iteration
+    stop (StopCondition): Stop before the last iteration once these criteria are met, patience
+        being counted in iterations, or when interrupted
+
+    Returns:
+    best_routes (list of lists): The best routes for each vehicle
+    best_cost (int): The total cost of the best routes
+    """
+    distances = as_distance_matrix(graph)
+    routes = savings_routes(distances, vehicles_amount)
+    routes += [[] for _ in range(vehicles_amount - len(routes))]
+    best_routes = [route.copy() for route in routes]
+
+    if distances.number_of_nodes() > 2:
+        # Plain lists are faster than arrays for the scalar accesses of single moves
+        weights = scalar_weights(distances)
+        neighbors = nearest_neighbors(distances, neighbors_k).tolist()
+        positions = RoutePositions(routes, distances.number_of_nodes())
+        cost = best_cost = sum(calculate_route_cost_matrix(distances, route) for route in routes)
+        tabu = {}  # Edge -> iteration at which it may be added again
+
+        try:
+            for iteration in range(iterations):
+                best_move, best_delta, best_removed = None, math.inf, None
+                for _ in range(candidates):
+                    move = sample_move(positions, neighbors)
+                    if move is None:
+                        continue
+                    removed, added = move_edges(positions, move)
+                    delta = edges_cost(weights, added) - edges_cost(weights, removed)
+                    # Also rejects the undefined (nan) deltas of moves through missing edges
+                    if not delta < best_delta:
+                        continue
+                    if cost + delta >= best_cost and any(
+                        tabu.get(_edge(a, b), 0) > iteration for a, b in added
+                    ):
+                        continue
+                    best_move, best_delta, best_removed = move, delta, removed
+
+                if best_move is not None:
+                    apply_move(positions, best_move)
+                    tenure = iteration + random.randint(*TABU_TENURE)
+                    for a, b in best_removed:
+                        tabu[_edge(a, b)] = tenure
+                    cost += best_delta
+                    if not math.isfinite(cost):
+                        cost = sum(calculate_route_cost_matrix(distances, route) for route in routes)
+                    if cost < best_cost:
+                        best_cost = cost
+                        best_routes = [route.copy() for route in routes]
+                if stop is not None:
+                    stop.record(cost)
+                    if stop.should_stop():
+                        break
+        except KeyboardInterrupt:
+            # Return the best solution found so far
+            if stop is None:
+                raise
+            stop.interrupted = True
+
+    # The running cost accumulates rounding errors, so the best routes are summed again
+    best_cost = sum(calculate_route_cost_matrix(distances, route) for route in best_routes)
+    if best_cost >= sys.maxsize:
+        return None, sys.maxsize
+    return [distances.to_labels(route) for route in best_routes], int(best_cost)
+
+
+if __name__ == "__main__":
+    results = []
+
+    # Initialize the JSON file
+    save_results_to_json(results, OUTPUT_FILENAME)
+    instances = InstanceCache() if SHORTEST_PATHS else None
+
+    for f in sorted(os.listdir(INPUT_DIR)):
+        graph_filename = os.path.join(INPUT_DIR, f)
+        print(f"Processing {graph_filename}")
+        # Load the graph (or its shortest path closure, cached between runs)
+        graph = instances.shortest_paths(graph_filename) if instances else load_distance_matrix(graph_filename)
+        vehicles_results = []
+        for vehicles_amount in VEHICLES_AMOUNTS:
+            start_time = time.time()
+            # Solve VRP using tabu search
+            best_routes, best_cost = vrp_tabu_search(graph, vehicles_amount)
+            end_time = time.time()
+            execution_time = end_time - start_time
+            if best_routes is not None:
+                best_routes = graph.expand_routes(get_routes(best_routes))
+
+            # Print the best routes, their cost, and execution time
+            print(f"Best routes: {best_routes}")
+            print(f"Total cost: {best_cost}")
+            print(f"Vehicles amount: {vehicles_amount}")
+            print(f"Execution time: {execution_time} seconds\n")
+
+            vehicles_results.append(
+                {
+                    "vehicles_amount": vehicles_amount,
+                    "execution_time": execution_time,
+                    "best_routes": best_routes,
+                    "total_cost": best_cost,
+                }
+            )
+
+            # Save the results
+            results.append(
+                {
+                    "name": graph_filename,
+                    "nodes_count": graph.number_of_nodes(),
+                    "edges_count": graph.number_of_edges(),
+                    "vehicles_amounts": vehicles_results,
+                }
+            )
+
+        # Append the results to the JSON file
+        save_results_to_json(results, OUTPUT_FILENAME)
@@ -1,10 +1,30 @@
 import networkx as nx
+import numpy as np
 import itertools
+import bisect
+import math
 import sys
 import os
 import json
+import struct
 import time
 
+DEPOT = "A"
+
+# Binary instance format: header, UTF-8 label table, condensed upper triangle of the weights
+BINARY_EXTENSION = ".vrpb"
+BINARY_MAGIC = b"VRPB"
+BINARY_VERSION = 1
+# Magic, version, number of nodes, bytes per weight, bytes of the label table
+BINARY_HEADER = struct.Struct("<4sIIII")
+
+# Coordinate instance format: one "label x y" line per node, distances are Euclidean
+COORDINATES_EXTENSION = ".xy"
+# Coordinate instances with fewer nodes get a dense matrix, larger ones compute distances on demand
+LAZY_WEIGHTS_MIN_NODES = 2000
+# Average number of nodes per cell of the grid index used for neighbor queries
+GRID_NODES_PER_CELL = 4
+
 
 def load_graph(filename: str) -> nx.Graph:
     """
@@ -45,6 +65,784 @@ def calculate_route_cost(graph: nx.Graph, route: list) -> int:
             return sys.maxsize  # Zwróć maksymalny koszt, aby ta trasa nie była wybierana
     return cost
 
+class DistanceMatrix:
+    """
+    Dense representation of a graph as a NumPy distance matrix.
+
+    Node labels are mapped to contiguous integer ids once, with the depot always
+    at id 0. Missing edges are stored as an infinite weight. For large coordinate instances
+    the weights are an EuclideanWeights object, which is indexed like the matrix but computes
+    the distances on demand. After shortest_path_closure() the weights are shortest path
+    lengths, next_hop holds the first node on each shortest path for expand_routes(), and
+    edges_count the number of edges of the original graph.
+    """
+
+    __slots__ = ("labels", "index", "weights", "next_hop", "edges_count")
+
+    def __init__(self, labels: list, weights: np.ndarray, next_hop: np.ndarray = None, edges_count: int = None):
+        self.labels = labels
+        self.index = {label: i for i, label in enumerate(labels)}
+        self.weights = weights
+        self.next_hop = next_hop
+        self.edges_count = edges_count
+
+    def number_of_nodes(self) -> int:
+        return len(self.labels)
+
+    def number_of_edges(self) -> int:
+        if self.edges_count is not None:
+            return self.edges_count
+        if isinstance(self.weights, EuclideanWeights):
+            return len(self.labels) * (len(self.labels) - 1) // 2
+        upper = self.weights[np.triu_indices(len(self.labels), k=1)]
+        return int(np.count_nonzero(np.isfinite(upper)))
+
+    def customers(self) -> list[int]:
+        """
+        Return the ids of all nodes except the depot.
+        """
+        return list(range(1, len(self.labels)))
+
+    def to_ids(self, route: list) -> np.ndarray:
+        return np.array([self.index[node] for node in route], dtype=np.int64)
+
+    def to_labels(self, route) -> list:
+        return [self.labels[node] for node in route]
+
+    def expand_routes(self, routes: list) -> list:
+        """
+        Replace every edge of routes of labels by the shortest path it stands for.
+
+        Routes may start and end at the depot or leave it implicit, as the solvers return them.
+        Without a shortest path closure the routes are returned unchanged.
+
+        Parameters:
+        routes (list of lists): The routes, as node labels
+
+        Returns:
+        routes (list of lists): The routes with the intermediate nodes of every edge
+        """
+        if self.next_hop is None or routes is None:
+            return routes
+        next_hop = self.next_hop.tolist()
+        expanded = []
+        for route in routes:
+            wrapped = len(route) > 1 and route[0] == self.labels[0] and route[-1] == self.labels[0]
+            nodes = [self.index[node] for node in route] if wrapped else [0] + [self.index[node] for node in route] + [0]
+            path = nodes[:1]
+            for u, v in zip(nodes[:-1], nodes[1:]):
+                while True:
+                    u = next_hop[u][v]
+                    path.append(u)
+                    if u == v:
+                        break
+            expanded.append(self.to_labels(path if wrapped else path[1:-1]))
+        return expanded
+
+
+class EuclideanWeights:
+    """
+    Stand-in for the weight matrix of a complete graph given by node coordinates.
+
+    Indexing with integers, slices and index arrays behaves like indexing the dense matrix
+    (rows and columns broadcast like NumPy fancy indices, a slice in one position spans an
+    axis of its own), but only the requested distances are computed. Distances are rounded to
+    the nearest integer, as in TSPLIB EUC_2D instances. Memory stays O(n), so code that gathers
+    the edges it needs works unchanged on instances far too large for a dense matrix; the exact
+    solvers, which need the whole matrix, are only meant for small instances anyway.
+    """
+
+    __slots__ = ("coordinates",)
+
+    def __init__(self, coordinates: np.ndarray):
+        self.coordinates = np.asarray(coordinates, dtype=np.float64)
+
+    @property
+    def shape(self) -> tuple:
+        return (len(self.coordinates), len(self.coordinates))
+
+    def __len__(self) -> int:
+        return len(self.coordinates)
+
+    def __getitem__(self, key):
+        rows, cols = key if isinstance(key, tuple) else (key, slice(None))
+        a = self.coordinates[rows]
+        b = self.coordinates[cols]
+        if isinstance(rows, slice):
+            a = a.reshape(a.shape[:1] + (1,) * (b.ndim - 1) + (2,))
+        elif isinstance(cols, slice):
+            a = a[..., None, :]
+        return np.floor(np.sqrt(((a - b) ** 2).sum(axis=-1)) + 0.5)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self[:, :], dtype=dtype)
+
+    def rows(self) -> list:
+        """
+        Return one object per node whose item j is the distance to node j, for scalar access.
+        """
+        xs, ys = self.coordinates.T.tolist()
+        return [_EuclideanRow(x, y, xs, ys) for x, y in zip(xs, ys)]
+
+
+class _EuclideanRow:
+    __slots__ = ("x", "y", "xs", "ys")
+
+    def __init__(self, x: float, y: float, xs: list, ys: list):
+        self.x, self.y, self.xs, self.ys = x, y, xs, ys
+
+    def __getitem__(self, j: int) -> float:
+        return math.floor(math.hypot(self.x - self.xs[j], self.y - self.ys[j]) + 0.5)
+
+
+def scalar_weights(distances: DistanceMatrix) -> list:
+    """
+    Return the weights in the fastest form for many single-edge lookups weights[i][j].
+
+    Plain nested lists for a dense matrix, rows computing the distances for coordinates.
+    """
+    if isinstance(distances.weights, EuclideanWeights):
+        return distances.weights.rows()
+    return distances.weights.tolist()
+
+
+def shortest_path_closure(distances: DistanceMatrix) -> DistanceMatrix:
+    """
+    Replace the weights of a graph by the lengths of the shortest paths between the nodes.
+
+    On a sparse graph (GRAPH_DESITY < 1) every missing edge that can be bypassed gets the
+    length of the detour, so the solvers can route through intermediate nodes and no
+    individual is infeasible because of a missing edge. The paths are recorded as next hops
+    for DistanceMatrix.expand_routes(). A vectorized Floyd-Warshall takes n relaxation steps
+    over the whole matrix, O(n^3) work in total, so the result is worth caching (see
+    InstanceCache.shortest_paths()). Coordinate instances are complete and returned unchanged.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+
+    Returns:
+    closure (DistanceMatrix): The shortest path lengths, with the next hop of every path and
+    the edge count of the original graph
+    """
+    if isinstance(distances.weights, EuclideanWeights):
+        return distances
+    size = distances.number_of_nodes()
+    weights = np.array(distances.weights, dtype=np.float64)
+    next_hop = np.tile(np.arange(size, dtype=np.int32), (size, 1))
+    for k in range(size):
+        through = weights[:, k, None] + weights[k]
+        shorter = through < weights
+        np.copyto(weights, through, where=shorter)
+        np.copyto(next_hop, next_hop[:, k, None], where=shorter)
+    return DistanceMatrix(list(distances.labels), weights, next_hop, distances.number_of_edges())
+
+
+def _depot_first(labels: list) -> list:
+    if DEPOT in labels:
+        labels.remove(DEPOT)
+        return [DEPOT] + labels
+    return labels
+
+
+def graph_to_distance_matrix(graph: nx.Graph) -> DistanceMatrix:
+    """
+    Convert a networkx graph to a distance matrix.
+
+    Parameters:
+    graph (networkx.Graph): The graph
+
+    Returns:
+    distances (DistanceMatrix): The graph as a dense distance matrix
+    """
+    labels = _depot_first(list(graph.nodes))
+    index = {label: i for i, label in enumerate(labels)}
+    weights = np.full((len(labels), len(labels)), np.inf)
+    np.fill_diagonal(weights, 0)
+    for u, v, weight in graph.edges(data="weight"):
+        weights[index[u], index[v]] = weights[index[v], index[u]] = weight
+    return DistanceMatrix(labels, weights)
+
+
+def as_distance_matrix(graph) -> DistanceMatrix:
+    """
+    Return the graph as a distance matrix, converting networkx graphs if needed.
+    """
+    if isinstance(graph, DistanceMatrix):
+        return graph
+    return graph_to_distance_matrix(graph)
+
+
+def load_distance_matrix(filename: str) -> DistanceMatrix:
+    """
+    Load a graph from a file straight into a distance matrix.
+
+    Files with the BINARY_EXTENSION are read with load_distance_matrix_binary(), files with the
+    COORDINATES_EXTENSION with load_coordinates(), other files are parsed as text edge lists.
+
+    Parameters:
+    filename (str): The name of the file
+
+    Returns:
+    distances (DistanceMatrix): The loaded graph
+    """
+    if filename.endswith(BINARY_EXTENSION):
+        return load_distance_matrix_binary(filename)
+    if filename.endswith(COORDINATES_EXTENSION):
+        return load_coordinates(filename)
+    edges = []
+    index = {}
+    with open(filename, "r") as file:
+        for line in file:
+            u, v, weight = line.strip().strip("()").split(", ")
+            index.setdefault(u, len(index))
+            index.setdefault(v, len(index))
+            edges.append((u, v, int(weight)))
+    labels = _depot_first(list(index))
+    index = {label: i for i, label in enumerate(labels)}
+    weights = np.full((len(labels), len(labels)), np.inf)
+    np.fill_diagonal(weights, 0)
+    if edges:
+        u, v, w = zip(*edges)
+        u = [index[node] for node in u]
+        v = [index[node] for node in v]
+        weights[u, v] = w
+        weights[v, u] = w
+    return DistanceMatrix(labels, weights)
+
+
+def load_coordinates(filename: str) -> DistanceMatrix:
+    """
+    Load a coordinate instance, a complete graph with Euclidean distances.
+
+    Instances of at least LAZY_WEIGHTS_MIN_NODES nodes keep only the coordinates and compute
+    the distances on demand (see EuclideanWeights), smaller ones get a dense matrix.
+
+    Parameters:
+    filename (str): The name of the file
+
+    Returns:
+    distances (DistanceMatrix): The loaded graph
+    """
+    labels = []
+    coordinates = []
+    with open(filename, "r") as file:
+        for line in file:
+            if line.strip():
+                label, x, y = line.split()
+                labels.append(label)
+                coordinates.append((float(x), float(y)))
+    coordinates = np.array(coordinates, dtype=np.float64).reshape(-1, 2)
+    if DEPOT in labels:
+        depot = labels.index(DEPOT)
+        order = [depot] + [i for i in range(len(labels)) if i != depot]
+        labels = [labels[i] for i in order]
+        coordinates = coordinates[order]
+    weights = EuclideanWeights(coordinates)
+    if len(labels) < LAZY_WEIGHTS_MIN_NODES:
+        weights = np.asarray(weights)
+    return DistanceMatrix(labels, weights)
+
+
+def save_coordinates(filename: str, labels: list, coordinates: np.ndarray):
+    """
+    Save a coordinate instance, one "label x y" line per node.
+
+    Parameters:
+    filename (str): The name of the file
+    labels (list): The node labels, the depot first
+    coordinates (numpy.ndarray): The coordinates of every node (nodes x 2)
+    """
+    with open(filename, "w") as file:
+        file.write("".join(f"{label} {x} {y}\n" for label, (x, y) in zip(labels, coordinates.tolist())))
+
+
+def _binary_weights_offset(label_bytes: int) -> int:
+    # The weights start at the next multiple of 8 bytes after the label table
+    return -(-(BINARY_HEADER.size + label_bytes) // 8) * 8
+
+
+def save_distance_matrix_binary(distances: DistanceMatrix, filename: str):
+    """
+    Save a distance matrix in the binary instance format.
+
+    The file holds a fixed header, the node labels in id order (the depot first) as one
+    newline-separated UTF-8 block, and the upper triangle of the weight matrix row by row,
+    missing edges being stored as inf. Weights are stored as float32 when that is exact
+    (integer weights below 2^24), and as float64 otherwise.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    filename (str): The name of the output file
+    """
+    n = distances.number_of_nodes()
+    condensed = distances.weights[np.triu_indices(n, k=1)]
+    finite = condensed[np.isfinite(condensed)]
+    exact = np.array_equal(finite, np.round(finite)) and (len(finite) == 0 or np.abs(finite).max() < 2**24)
+    with open(filename, "wb") as file:
+        write_binary_header(file, distances.labels, np.float32 if exact else np.float64)
+        file.write(condensed.astype(np.float32 if exact else np.float64).tobytes())
+
+
+def write_binary_header(file, labels: list, dtype: type):
+    """
+    Write the header and the label table of a binary instance file.
+
+    The condensed upper triangle of the weights, in the given dtype, is expected to follow,
+    so that large instances can be written in chunks without a dense matrix.
+
+    Parameters:
+    file (file): The output file, opened in binary mode
+    labels (list): The node labels in id order, the depot first
+    dtype (type): numpy.float32 or numpy.float64
+    """
+    encoded = "\n".join(str(label) for label in labels).encode("utf-8")
+    file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(labels), np.dtype(dtype).itemsize, len(encoded)))
+    file.write(encoded)
+    file.write(bytes(_binary_weights_offset(len(encoded)) - BINARY_HEADER.size - len(encoded)))
+
+
+def load_distance_matrix_binary(filename: str) -> DistanceMatrix:
+    """
+    Load a graph saved by save_distance_matrix_binary() into a distance matrix.
+
+    The weights are memory-mapped and copied row by row into the dense matrix, so no edge
+    list or networkx graph is ever built.
+
+    Parameters:
+    filename (str): The name of the file
+
+    Returns:
+    distances (DistanceMatrix): The loaded graph
+    """
+    with open(filename, "rb") as file:
+        magic, version, n, itemsize, label_bytes = BINARY_HEADER.unpack(file.read(BINARY_HEADER.size))
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError(f"Not a version {BINARY_VERSION} binary graph: {filename}")
+        labels = file.read(label_bytes).decode("utf-8").split("\n") if n else []
+
+    weights = np.zeros((n, n))
+    if n > 1:
+        condensed = np.memmap(
+            filename,
+            dtype=np.float32 if itemsize == 4 else np.float64,
+            mode="r",
+            offset=_binary_weights_offset(label_bytes),
+            shape=(n * (n - 1) // 2,),
+        )
+        start = 0
+        for i in range(n - 1):
+            weights[i, i + 1 :] = condensed[start : start + n - 1 - i]
+            start += n - 1 - i
+        del condensed
+        weights += weights.T
+    return DistanceMatrix(labels, weights)
+
+
+def calculate_route_cost_matrix(distances: DistanceMatrix, route: np.ndarray):
+    """
+    Calculate the cost of a route of node ids with a single fancy-indexed sum.
+
+    The depot is prepended and appended implicitly. A 2-D array is treated as a
+    batch of routes of equal length and evaluated at once.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    route (numpy.ndarray): The route (or batch of routes) without the depot
+
+    Returns:
+    cost (int | numpy.ndarray): The cost of the route (sys.maxsize if an edge is missing),
+    or an array of costs (inf if an edge is missing) for a batch
+    """
+    route = np.asarray(route, dtype=np.int64)
+    depot = np.zeros(route.shape[:-1] + (1,), dtype=np.int64)
+    path = np.concatenate((depot, route, depot), axis=-1)
+    cost = distances.weights[path[..., :-1], path[..., 1:]].sum(axis=-1)
+    if route.ndim > 1:
+        return cost
+    return int(cost) if np.isfinite(cost) else sys.maxsize
+
+
+def calculate_tours_cost(distances: DistanceMatrix, tours: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    """
+    Calculate the total cost of a batch of giant tours in one vectorized pass.
+
+    Each giant tour holds the customers of all routes back to back. Route ends are
+    given as offsets into the tour, and the depot is inserted implicitly between
+    consecutive routes as well as at the start and end of the tour.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    tours (numpy.ndarray): Giant tours, one per row (individuals x positions)
+    bounds (numpy.ndarray): Route end offsets, shared (routes,) or per tour (individuals x routes)
+
+    Returns:
+    costs (numpy.ndarray): The total cost of each tour (inf if an edge is missing)
+    """
+    tours = np.atleast_2d(tours)
+    individuals, size = tours.shape
+    if size == 0:
+        return np.zeros(individuals)
+    weights = distances.weights
+    bounds = np.broadcast_to(bounds, (individuals, np.shape(bounds)[-1]))
+
+    # Mark the positions after which a vehicle returns to the depot
+    breaks = np.zeros((individuals, size + 1), dtype=bool)
+    breaks[np.arange(individuals)[:, None], bounds] = True
+    rows, cols = np.nonzero(breaks[:, 1:size])
+
+    edges = weights[tours[:, :-1], tours[:, 1:]]
+    edges[rows, cols] = weights[tours[rows, cols], 0] + weights[0, tours[rows, cols + 1]]
+    return edges.sum(axis=1) + weights[0, tours[:, 0]] + weights[tours[:, -1], 0]
+
+
+def calculate_route_costs(distances: DistanceMatrix, tour: list, bounds: list) -> list[float]:
+    """
+    Calculate the cost of each route of a giant tour.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    tour (list): The giant tour
+    bounds (list): Route end offsets
+
+    Returns:
+    route_costs (list of float): The cost of each route (inf if an edge is missing)
+    """
+    route_costs = []
+    start = 0
+    for end in bounds:
+        path = [0] + list(tour[start:end]) + [0]
+        route_costs.append(float(distances.weights[path[:-1], path[1:]].sum()))
+        start = end
+    return route_costs
+
+
+def swap_route_costs(distances: DistanceMatrix, tour: list, bounds: list, route_costs: list, i: int, j: int) -> dict:
+    """
+    Calculate the route costs after swapping the nodes at two positions of a giant tour.
+
+    Only the edges adjacent to the two positions are evaluated, so the cost of a move
+    does not depend on the route lengths. The tour itself is left unchanged.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    tour (list): The giant tour
+    bounds (list): Route end offsets
+    route_costs (list): The cached cost of each route
+    i (int): The first swapped position
+    j (int): The second swapped position
+
+    Returns:
+    new_costs (dict): The new cost of each affected route, keyed by route index
+    """
+    weights = distances.weights
+    # Collect the affected edges as (position, position) pairs, -1 standing for the depot
+    edges = {}
+    for position in (i, j):
+        route = bisect.bisect_right(bounds, position)
+        start = bounds[route - 1] if route else 0
+        prev = position - 1 if position > start else -1
+        succ = position + 1 if position < bounds[route] - 1 else -1
+        edges.setdefault((prev, position), route)
+        edges.setdefault((position, succ), route)
+
+    swapped = {i: tour[j], j: tour[i]}
+    new_costs = {}
+    with np.errstate(invalid="ignore"):
+        for (a, b), route in edges.items():
+            old_a = tour[a] if a >= 0 else 0
+            old_b = tour[b] if b >= 0 else 0
+            new_a = swapped.get(a, old_a)
+            new_b = swapped.get(b, old_b)
+            new_costs[route] = new_costs.get(route, route_costs[route]) - weights[old_a, old_b] + weights[new_a, new_b]
+
+    # A missing edge makes the delta undefined, so such routes are re-summed
+    for route, cost in new_costs.items():
+        if not np.isfinite(cost):
+            start = bounds[route - 1] if route else 0
+            path = [0] + [swapped.get(k, tour[k]) for k in range(start, bounds[route])] + [0]
+            new_costs[route] = float(weights[path[:-1], path[1:]].sum())
+    return new_costs
+
+
+def optimal_split(
+    distances: DistanceMatrix, tours: np.ndarray, vehicles_amount: int, use_all_vehicles: bool = False
+) -> tuple:
+    """
+    Split giant tours optimally into at most vehicles_amount routes (Split decoder).
+
+    For a fixed visiting order, the cheapest partition into consecutive routes is found with
+    a dynamic program over the route count. Each DP level is a prefix minimum over the tour,
+    so a whole population is decoded in O(vehicles_amount * n) vectorized steps.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    tours (numpy.ndarray): Giant tours, one per row (individuals x positions)
+    vehicles_amount (int): The maximum number of routes
+    use_all_vehicles (bool): Require every vehicle to serve at least one customer (as far as
+        there are enough customers), instead of allowing empty routes
+
+    Returns:
+    costs (numpy.ndarray): The cost of the best split of each tour (inf if an edge is missing)
+    bounds (numpy.ndarray): Route end offsets of the best split (individuals x vehicles_amount)
+    """
+    tours = np.atleast_2d(tours)
+    individuals, size = tours.shape
+    bounds = np.full((individuals, vehicles_amount), size, dtype=tours.dtype)
+    if size == 0:
+        return np.zeros(individuals), bounds
+    levels = min(vehicles_amount, size) if use_all_vehicles else vehicles_amount
+
+    # Missing edges get a large finite penalty, so that differences of prefix sums stay defined
+    penalty = 1e12
+    weights = distances.weights
+    path = weights[tours[:, :-1], tours[:, 1:]]
+    leave = weights[0, tours]
+    enter = weights[tours, 0]
+    for edges in (path, leave, enter):
+        edges[~np.isfinite(edges)] = penalty
+    prefix = np.zeros((individuals, size))
+    np.cumsum(path, axis=1, out=prefix[:, 1:])
+    out = leave - prefix  # Leaving the depot at position a, minus the path up to a
+    back = prefix + enter  # Path up to position b, plus the return to the depot
+    positions = np.arange(size)
+
+    # best[k][:, m] is the cheapest cover of the first m positions with at most k routes
+    # (exactly k non-empty routes with use_all_vehicles)
+    best = [np.full((individuals, size + 1), np.inf)]
+    best[0][:, 0] = 0
+    starts = []
+    for _ in range(levels):
+        previous = best[-1]
+        opening = previous[:, :-1] + out
+        running = np.minimum.accumulate(opening, axis=1)
+        # Latest position achieving the running minimum, i.e. the start of the last route
+        starts.append(np.maximum.accumulate(np.where(opening == running, positions, 0), axis=1))
+        if use_all_vehicles:
+            current = np.full_like(previous, np.inf)
+            current[:, 1:] = running + back
+        else:
+            current = previous.copy()
+            np.minimum(previous[:, 1:], running + back, out=current[:, 1:])
+        best.append(current)
+
+    # Walk back through the levels to recover the route ends
+    rows = np.arange(individuals)
+    end = np.full(individuals, size)
+    for k in range(levels, 0, -1):
+        bounds[:, k - 1] = end
+        used = (end > 0) & (use_all_vehicles | (best[k][rows, end] < best[k - 1][rows, end]))
+        end = np.where(used, starts[k - 1][rows, np.maximum(end - 1, 0)], end)
+
+    costs = best[levels][:, size]
+    costs[costs >= penalty] = np.inf
+    return costs, bounds
+
+
+def nearest_neighbors(distances: DistanceMatrix, k: int) -> np.ndarray:
+    """
+    Precompute the k cheapest customer neighbors of every node.
+
+    For coordinate instances with on-demand distances the neighbors are found with a grid
+    index (see _grid_nearest_neighbors()) instead of the full matrix.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+    k (int): The number of neighbors per node
+
+    Returns:
+    neighbors (numpy.ndarray): Node ids of the neighbors of each node, sorted by edge weight
+    (nodes x k)
+    """
+    size = distances.number_of_nodes()
+    k = max(0, min(k, size - 2))
+    if isinstance(distances.weights, EuclideanWeights):
+        return _grid_nearest_neighbors(distances.weights.coordinates, k)
+    weights = distances.weights[:, 1:].copy()  # The depot is never a candidate
+    weights[np.arange(1, size), np.arange(size - 1)] = np.inf  # Nor the node itself
+    nearest = np.argpartition(weights, k - 1, axis=1)[:, :k] if k else np.empty((size, 0), dtype=np.int64)
+    order = np.argsort(np.take_along_axis(weights, nearest, axis=1), axis=1, kind="stable")
+    return (np.take_along_axis(nearest, order, axis=1) + 1).astype(np.int32)
+
+
+def _grid_nearest_neighbors(coordinates: np.ndarray, k: int) -> np.ndarray:
+    """
+    Find the k nearest customers of every node with a uniform grid over the customers.
+
+    The customers are bucketed into square cells holding GRID_NODES_PER_CELL of them on
+    average. The queries of a cell search a growing block of cells around it, until the k-th
+    nearest candidate is closer than anything outside the block can be, which keeps the work
+    and memory per query proportional to k for evenly spread nodes.
+
+    Parameters:
+    coordinates (numpy.ndarray): The coordinates of every node, the depot first (nodes x 2)
+    k (int): The number of neighbors per node, at most nodes - 2
+
+    Returns:
+    neighbors (numpy.ndarray): Node ids of the neighbors of each node, sorted by distance
+    (nodes x k)
+    """
+    size = len(coordinates)
+    neighbors = np.empty((size, k), dtype=np.int32)
+    if k == 0:
+        return neighbors
+    points = coordinates[1:]  # The depot is never a candidate
+    low = points.min(axis=0)
+    span = max(float((points.max(axis=0) - low).max()), 1e-9)
+    cells = max(1, int(math.sqrt(len(points) / GRID_NODES_PER_CELL)))
+    cell_size = span / cells
+    grid = np.minimum(((points.max(axis=0) - low) // cell_size).astype(np.int64) + 1, cells)
+
+    def cell_of(xy: np.ndarray) -> np.ndarray:
+        return np.clip(((xy - low) // cell_size).astype(np.int64), 0, grid - 1)
+
+    # Customers sorted by cell (column-major over the grid), so every column span is one slice
+    point_cells = cell_of(points)
+    order = np.argsort(point_cells[:, 0] * grid[1] + point_cells[:, 1], kind="stable")
+    starts = np.searchsorted(
+        (point_cells[order, 0] * grid[1] + point_cells[order, 1]), np.arange(grid[0] * grid[1] + 1)
+    )
+    sorted_points = points[order]
+    sorted_ids = order + 1
+
+    query_cells = cell_of(coordinates)
+    query_keys = query_cells[:, 0] * grid[1] + query_cells[:, 1]
+    query_order = np.argsort(query_keys, kind="stable")
+    boundaries = np.flatnonzero(np.diff(query_keys[query_order])) + 1
+    for queries in np.split(query_order, boundaries):
+        x, y = query_cells[queries[0]]
+        pending = queries
+        radius = 1
+        while len(pending):
+            x0, x1 = max(x - radius, 0), min(x + radius, grid[0] - 1)
+            y0, y1 = max(y - radius, 0), min(y + radius, grid[1] - 1)
+            candidates = np.concatenate(
+                [np.arange(starts[c * grid[1] + y0], starts[c * grid[1] + y1 + 1]) for c in range(x0, x1 + 1)]
+            )
+            if len(candidates) <= k:
+                radius *= 2
+                continue
+            query_xy = coordinates[pending]
+            lengths = np.sqrt(((query_xy[:, None, :] - sorted_points[candidates][None, :, :]) ** 2).sum(axis=2))
+            lengths[sorted_ids[candidates][None, :] == pending[:, None]] = np.inf  # Nor the node itself
+            nearest = np.argpartition(lengths, k - 1, axis=1)[:, :k]
+            nearest_distances = np.take_along_axis(lengths, nearest, axis=1)
+            # Nothing outside the block is closer than the distance from the query to the block border
+            margin = np.full(len(pending), np.inf)
+            if x0 > 0:
+                margin = np.minimum(margin, query_xy[:, 0] - (low[0] + x0 * cell_size))
+            if x1 < grid[0] - 1:
+                margin = np.minimum(margin, low[0] + (x1 + 1) * cell_size - query_xy[:, 0])
+            if y0 > 0:
+                margin = np.minimum(margin, query_xy[:, 1] - (low[1] + y0 * cell_size))
+            if y1 < grid[1] - 1:
+                margin = np.minimum(margin, low[1] + (y1 + 1) * cell_size - query_xy[:, 1])
+            done = nearest_distances.max(axis=1) <= margin
+            if done.any():
+                rows = np.argsort(nearest_distances[done], axis=1, kind="stable")
+                found = np.take_along_axis(nearest[done], rows, axis=1)
+                neighbors[pending[done]] = sorted_ids[candidates[found]]
+            pending = pending[~done]
+            radius *= 2
+    return neighbors
+
+
+def customer_lower_bounds(distances: DistanceMatrix) -> np.ndarray:
+    """
+    Bound the share of every customer in the cost of any solution from below.
+
+    In a (symmetric) solution every customer has two incident edges, or the depot edge twice
+    if it is served alone, and every edge is counted at both of its endpoints. Half of the
+    cheapest such pair of every customer is therefore a lower bound on its share, and the sum
+    of these bounds a lower bound on the cost of any solution.
+
+    Parameters:
+    distances (DistanceMatrix): The distance matrix
+
+    Returns:
+    bounds (numpy.ndarray): The bound of every node (0 for the depot)
+    """
+    size = distances.number_of_nodes()
+    pairs = np.full(size, np.inf)
+    if isinstance(distances.weights, EuclideanWeights) and size > 2:
+        # The two cheapest edges of a node are among its two nearest customers and the depot edge
+        nearest = nearest_neighbors(distances, 2)
+        cheapest = np.column_stack((distances.weights[np.arange(size)[:, None], nearest], distances.weights[:, 0]))
+        cheapest[0, 2] = np.inf
+        pairs = np.partition(cheapest, 1, axis=1)[:, :2].sum(axis=1)
+    elif size > 2:
+        others = distances.weights.copy()
+        np.fill_diagonal(others, np.inf)
+        pairs = np.partition(others, 1, axis=1)[:, :2].sum(axis=1)
+    bounds = np.minimum(pairs, 2 * distances.weights[:, 0]) / 2
+    bounds[:1] = 0
+    return bounds
+
+
+def split_tour(tour: np.ndarray, bounds: np.ndarray) -> list[np.ndarray]:
+    """
+    Split a giant tour into the routes of each vehicle.
+
+    Parameters:
+    tour (numpy.ndarray): The giant tour
+    bounds (numpy.ndarray): Route end offsets
+
+    Returns:
+    routes (list of numpy.ndarray): The route of each vehicle
+    """
+    return np.split(tour, bounds[:-1])
+
+
+class StopCondition:
+    """
+    Stopping criteria of an anytime solver.
+
+    The solver records the cost of its best solution after every step (a generation, an
+    iteration, a batch) and stops as soon as the time limit is reached, the target cost is
+    met, or the best cost has not improved for `patience` steps. When the run is interrupted,
+    the solver sets `interrupted` and returns its best solution so far, which it may also keep
+    in `incumbent`.
+    """
+
+    __slots__ = ("deadline", "target_cost", "patience", "best_cost", "stale", "incumbent", "interrupted")
+
+    def __init__(self, time_limit: float = None, target_cost: float = None, patience: float = None):
+        """
+        Parameters:
+        time_limit (float): The wall-clock budget in seconds, counted from now (None = unlimited)
+        target_cost (float): Stop once a solution at least this good is found (None = never)
+        patience (float): Stop after this many steps without improvement (None = never)
+        """
+        self.deadline = time.time() + time_limit if time_limit is not None else None
+        self.target_cost = target_cost
+        self.patience = patience
+        self.best_cost = np.inf
+        self.stale = 0
+        self.incumbent = None
+        self.interrupted = False
+
+    def record(self, cost: float, steps: float = 1) -> bool:
+        """
+        Record the best cost of the last steps.
+
+        Returns:
+        improved (bool): Whether the cost improves on the best one so far
+        """
+        if cost < self.best_cost:
+            self.best_cost = cost
+            self.stale = 0
+            return True
+        self.stale += steps
+        return False
+
+    def should_stop(self) -> bool:
+        return (
+            self.interrupted
+            or (self.deadline is not None and time.time() >= self.deadline)
+            or (self.target_cost is not None and self.best_cost <= self.target_cost)
+            or (self.patience is not None and self.stale >= self.patience)
+        )
+
+
 def get_route(route:list)->list:
     return ['A']+ route + ['A']
 